@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+import dj_database_url
 from decouple import config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,10 +54,7 @@ TEMPLATES = [
 WSGI_APPLICATION = 'ecommerce_project.wsgi.application'
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': config('DATABASE_URL', default=f'sqlite:///{BASE_DIR / "db.sqlite3"}', cast=dj_database_url.parse)
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -85,3 +83,83 @@ REST_FRAMEWORK = {
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+RECOMMENDATION_PRECOMPUTE = config('RECOMMENDATION_PRECOMPUTE', default=True, cast=bool)
+RECOMMENDATION_PRECOMPUTE_TOP_N = config('RECOMMENDATION_PRECOMPUTE_TOP_N', default=20, cast=int)
+RECOMMENDATION_CANDIDATE_POOL = config('RECOMMENDATION_CANDIDATE_POOL', default=50, cast=int)
+RECOMMENDATION_FOLD_IN_ON_DEMAND = config('RECOMMENDATION_FOLD_IN_ON_DEMAND', default=True, cast=bool)
+RECOMMENDATION_CONTENT_NEIGHBOURS = config('RECOMMENDATION_CONTENT_NEIGHBOURS', default=50, cast=int)
+RECOMMENDATION_ANN = config('RECOMMENDATION_ANN', default=True, cast=bool)
+RECOMMENDATION_ANN_MIN_USERS = config('RECOMMENDATION_ANN_MIN_USERS', default=10000, cast=int)
+RECOMMENDATION_ANN_TABLES = config('RECOMMENDATION_ANN_TABLES', default=8, cast=int)
+RECOMMENDATION_ANN_BITS = config('RECOMMENDATION_ANN_BITS', default=12, cast=int)
+RECOMMENDATION_ANN_MULTIPROBE = config('RECOMMENDATION_ANN_MULTIPROBE', default=True, cast=bool)
+RECOMMENDATION_ARTIFACTS = config('RECOMMENDATION_ARTIFACTS', default=True, cast=bool)
+RECOMMENDATION_ARTIFACT_DIR = config('RECOMMENDATION_ARTIFACT_DIR', default=str(BASE_DIR / 'ml_artifacts'))
+RECOMMENDATION_ARTIFACT_KEEP = config('RECOMMENDATION_ARTIFACT_KEEP', default=3, cast=int)
+RECOMMENDATION_ARTIFACT_CHECK_INTERVAL = config('RECOMMENDATION_ARTIFACT_CHECK_INTERVAL', default=30, cast=int)
+RECOMMENDATION_TRAINING_EXECUTOR = config('RECOMMENDATION_TRAINING_EXECUTOR', default='process')
+RECOMMENDATION_TRAINING_JOB_TIMEOUT = config('RECOMMENDATION_TRAINING_JOB_TIMEOUT', default=6 * 3600, cast=int)
+RECOMMENDATION_HISTORY_ENABLED = config('RECOMMENDATION_HISTORY_ENABLED', default=True, cast=bool)
+RECOMMENDATION_HISTORY_SAMPLE_RATE = config('RECOMMENDATION_HISTORY_SAMPLE_RATE', default=1.0, cast=float)
+RECOMMENDATION_HISTORY_BATCH_SIZE = config('RECOMMENDATION_HISTORY_BATCH_SIZE', default=500, cast=int)
+RECOMMENDATION_HISTORY_FLUSH_INTERVAL = config('RECOMMENDATION_HISTORY_FLUSH_INTERVAL', default=5.0, cast=float)
+INTERACTION_INGEST_MODE = config('INTERACTION_INGEST_MODE', default='memory')
+INTERACTION_INGEST_BATCH_SIZE = config('INTERACTION_INGEST_BATCH_SIZE', default=1000, cast=int)
+INTERACTION_INGEST_FLUSH_INTERVAL = config('INTERACTION_INGEST_FLUSH_INTERVAL', default=2.0, cast=float)
+INTERACTION_INGEST_MAX_PENDING = config('INTERACTION_INGEST_MAX_PENDING', default=100000, cast=int)
+INTERACTION_SPOOL_DIR = config('INTERACTION_SPOOL_DIR', default=str(BASE_DIR / 'interaction_spool'))
+RECOMMENDATION_USE_ROLLUP = config('RECOMMENDATION_USE_ROLLUP', default=True, cast=bool)
+RECOMMENDATION_ROLLUP_LAG = config('RECOMMENDATION_ROLLUP_LAG', default=5, cast=int)
+RECOMMENDATION_SCORE_HALF_LIFE_DAYS = config('RECOMMENDATION_SCORE_HALF_LIFE_DAYS', default=0.0, cast=float)
+RECOMMENDATION_COLLABORATIVE_TRAINER = config('RECOMMENDATION_COLLABORATIVE_TRAINER', default='svd')
+RECOMMENDATION_ALS_FACTORS = config('RECOMMENDATION_ALS_FACTORS', default=64, cast=int)
+RECOMMENDATION_ALS_ITERATIONS = config('RECOMMENDATION_ALS_ITERATIONS', default=15, cast=int)
+RECOMMENDATION_ALS_REGULARIZATION = config('RECOMMENDATION_ALS_REGULARIZATION', default=0.01, cast=float)
+RECOMMENDATION_ALS_ALPHA = config('RECOMMENDATION_ALS_ALPHA', default=40.0, cast=float)
+RECOMMENDATION_ALS_CG_STEPS = config('RECOMMENDATION_ALS_CG_STEPS', default=3, cast=int)
+RECOMMENDATION_ALS_THREADS = config('RECOMMENDATION_ALS_THREADS', default=0, cast=int)
+RECOMMENDATION_TRAINING_WORKERS = config('RECOMMENDATION_TRAINING_WORKERS', default=1, cast=int)
+RECOMMENDATION_CONTENT_BLOCK_SIZE = config('RECOMMENDATION_CONTENT_BLOCK_SIZE', default=5000, cast=int)
+SEARCH_MAX_RESULTS = config('SEARCH_MAX_RESULTS', default=100, cast=int)
+SEARCH_MAX_TERMS = config('SEARCH_MAX_TERMS', default=10, cast=int)
+SEARCH_MODE = config('SEARCH_MODE', default='text')
+PRODUCT_PAGE_SIZE = config('PRODUCT_PAGE_SIZE', default=24, cast=int)
+PRODUCT_PAGE_MAX_SIZE = config('PRODUCT_PAGE_MAX_SIZE', default=100, cast=int)
+INVENTORY_RESERVATION_SECONDS = config('INVENTORY_RESERVATION_SECONDS', default=900, cast=int)
+INVENTORY_RELEASE_BATCH_SIZE = config('INVENTORY_RELEASE_BATCH_SIZE', default=500, cast=int)
+CATALOG_CACHE_URL = config('CATALOG_CACHE_URL', default='')
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': CATALOG_CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+if CATALOG_CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES['catalog_shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CATALOG_CACHE_URL,
+        'TIMEOUT': CATALOG_CACHE_TIMEOUT,
+    }
+elif CATALOG_CACHE_URL.startswith('memcached://'):
+    CACHES['catalog_shared'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CATALOG_CACHE_URL.removeprefix('memcached://'),
+        'TIMEOUT': CATALOG_CACHE_TIMEOUT,
+    }
+
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60, cast=int)
+CACHES['pages'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'pages',
+    'TIMEOUT': PAGE_CACHE_TIMEOUT,
+    'OPTIONS': {'MAX_ENTRIES': 2000},
+}
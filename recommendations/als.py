@@ -0,0 +1,123 @@
+import numpy as np
+import scipy.sparse as sp
+
+try:
+    from . import matrix_operations
+except ImportError:
+    matrix_operations = None
+
+
+def confidence_matrix(matrix, alpha: float) -> sp.csr_matrix:
+    confidence = sp.csr_matrix(matrix, dtype=np.float64)
+    confidence.sum_duplicates()
+    confidence.eliminate_zeros()
+    confidence.data = np.sign(confidence.data) * (1.0 + alpha * np.abs(confidence.data))
+    return confidence
+
+
+def gramian(factors: np.ndarray, regularization: float) -> np.ndarray:
+    return factors.T @ factors + regularization * np.eye(factors.shape[1])
+
+
+def least_squares_cg_python(confidence: sp.csr_matrix, X: np.ndarray, Y: np.ndarray, regularization: float,
+                            cg_steps: int = 3, block_size: int = 2048):
+    YtY = gramian(Y, regularization)
+    n_items = Y.shape[0]
+
+    for start in range(0, X.shape[0], block_size):
+        stop = min(start + block_size, X.shape[0])
+        block = confidence[start:stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(block.indptr))
+        item_factors = Y[block.indices]
+        preference = (block.data > 0).astype(np.float64)
+        weights = np.abs(block.data)
+
+        def scatter(values):
+            return sp.csr_matrix((values, block.indices, block.indptr), shape=(stop - start, n_items)) @ Y
+
+        def product(vectors):
+            dots = np.einsum('ij,ij->i', item_factors, vectors[rows])
+            return vectors @ YtY + scatter((weights - 1.0) * dots)
+
+        x = X[start:stop]
+        dots = np.einsum('ij,ij->i', item_factors, x[rows])
+        r = scatter(weights * preference - (weights - 1.0) * dots) - x @ YtY
+        p = r.copy()
+        rsold = np.einsum('ij,ij->i', r, r)
+        active = rsold >= 1e-20
+
+        for _ in range(cg_steps):
+            if not active.any():
+                break
+            Ap = product(p)
+            pAp = np.einsum('ij,ij->i', p, Ap)
+            alpha = np.divide(rsold, pAp, out=np.zeros_like(rsold), where=active)
+            x += alpha[:, None] * p
+            r -= alpha[:, None] * Ap
+
+            rsnew = np.einsum('ij,ij->i', r, r)
+            active &= rsnew >= 1e-20
+            beta = np.divide(rsnew, rsold, out=np.zeros_like(rsnew), where=active)
+            p = np.where(active[:, None], r + beta[:, None] * p, p)
+            rsold = rsnew
+
+
+def least_squares_cg(confidence: sp.csr_matrix, X: np.ndarray, Y: np.ndarray, regularization: float,
+                     cg_steps: int = 3, num_threads: int = 0):
+    if matrix_operations is None:
+        return least_squares_cg_python(confidence, X, Y, regularization, cg_steps)
+
+    matrix_operations.least_squares_cg(
+        np.ascontiguousarray(confidence.indptr, dtype=np.int32),
+        np.ascontiguousarray(confidence.indices, dtype=np.int32),
+        np.ascontiguousarray(confidence.data, dtype=np.float64),
+        X, np.ascontiguousarray(Y), gramian(Y, regularization),
+        cg_steps, num_threads
+    )
+
+
+def implicit_als(matrix, factors: int = 64, regularization: float = 0.01, alpha: float = 40.0,
+                 iterations: int = 15, cg_steps: int = 3, seed: int = 0, num_threads: int = 0):
+    user_confidence = confidence_matrix(matrix, alpha)
+    item_confidence = user_confidence.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    user_factors = rng.random((user_confidence.shape[0], factors)) * 0.01
+    item_factors = rng.random((user_confidence.shape[1], factors)) * 0.01
+
+    for _ in range(iterations):
+        least_squares_cg(user_confidence, user_factors, item_factors, regularization, cg_steps, num_threads)
+        least_squares_cg(item_confidence, item_factors, user_factors, regularization, cg_steps, num_threads)
+
+    return user_factors.astype(np.float32), item_factors.astype(np.float32)
+
+
+def solve_user_factors(matrix, item_factors: np.ndarray, regularization: float = 0.01, alpha: float = 40.0,
+                       num_threads: int = 0) -> np.ndarray:
+    item_factors = np.asarray(item_factors, dtype=np.float64)
+    user_factors = np.zeros((matrix.shape[0], item_factors.shape[1]))
+    least_squares_cg(
+        confidence_matrix(matrix, alpha), user_factors, item_factors, regularization,
+        cg_steps=item_factors.shape[1], num_threads=num_threads
+    )
+    return user_factors.astype(np.float32)
+
+
+def check_kernels(n_users: int = 400, n_items: int = 300, density: float = 0.02, factors: int = 16,
+                  cg_steps: int = 3, seed: int = 0, tolerance: float = 1e-6) -> dict:
+    if matrix_operations is None:
+        raise ImportError('matrix_operations is not built; run `python setup.py build_ext --inplace`')
+
+    rng = np.random.default_rng(seed)
+    matrix = sp.random(n_users, n_items, density=density, format='csr', random_state=seed)
+    matrix.data = np.where(rng.random(matrix.nnz) < 0.1, -1.0, 1.0) * (matrix.data + 0.5)
+    confidence = confidence_matrix(matrix, alpha=10.0)
+    Y = rng.random((n_items, factors))
+
+    compiled = rng.random((n_users, factors))
+    python = compiled.copy()
+    least_squares_cg(confidence, compiled, Y, 0.1, cg_steps)
+    least_squares_cg_python(confidence, python, Y, 0.1, cg_steps)
+
+    error = float(np.abs(compiled - python).max() / max(np.abs(python).max(), 1.0))
+    return {'als_max_error': error, 'agree': error <= tolerance}
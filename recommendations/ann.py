@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class RandomProjectionIndex:
+
+    def __init__(self, n_tables: int = 8, n_bits: int = 12, multiprobe: bool = True, seed: int = 0):
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.multiprobe = multiprobe
+        self.seed = seed
+        self.planes = None
+        self.sorted_codes = None
+        self.sorted_rows = None
+
+    def hash(self, vectors: np.ndarray) -> np.ndarray:
+        projections = (vectors @ self.planes).reshape(len(vectors), self.n_tables, self.n_bits)
+        return (projections > 0).astype(np.int64) @ (1 << np.arange(self.n_bits, dtype=np.int64))
+
+    def build(self, vectors: np.ndarray):
+        rng = np.random.default_rng(self.seed)
+        self.planes = rng.standard_normal((vectors.shape[1], self.n_tables * self.n_bits)).astype(vectors.dtype)
+
+        codes = self.hash(vectors)
+        self.sorted_rows = np.argsort(codes, axis=0, kind='stable').T.copy()
+        self.sorted_codes = np.take_along_axis(codes, self.sorted_rows.T, axis=0).T.copy()
+        return self
+
+    def probe_codes(self, vectors: np.ndarray) -> np.ndarray:
+        codes = self.hash(vectors)[:, :, None]
+        if not self.multiprobe:
+            return codes
+        flips = np.concatenate([[0], 1 << np.arange(self.n_bits, dtype=np.int64)])
+        return codes ^ flips
+
+    def query(self, queries: np.ndarray, vectors: np.ndarray, k: int, exclude: np.ndarray = None):
+        n_vectors = len(vectors)
+        neighbours = np.zeros((len(queries), k), dtype=np.int64)
+        similarities = np.zeros((len(queries), k), dtype=np.float32)
+
+        codes = self.probe_codes(queries)
+        bounds = [
+            (
+                np.searchsorted(self.sorted_codes[table], codes[:, table], 'left'),
+                np.searchsorted(self.sorted_codes[table], codes[:, table], 'right'),
+            )
+            for table in range(self.n_tables)
+        ]
+
+        for i in range(len(queries)):
+            candidates = np.unique(np.concatenate([
+                self.sorted_rows[table][start:stop]
+                for table, (lo, hi) in enumerate(bounds)
+                for start, stop in zip(lo[i], hi[i])
+            ]))
+            candidates = candidates[candidates < n_vectors]
+            if exclude is not None:
+                candidates = candidates[candidates != exclude[i]]
+
+            if len(candidates) < k:
+                candidates = np.arange(n_vectors)
+                if exclude is not None:
+                    candidates = candidates[candidates != exclude[i]]
+
+            scores = vectors[candidates] @ queries[i]
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            neighbours[i] = candidates[top]
+            similarities[i] = scores[top]
+
+        return neighbours, similarities
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from django.utils import timezone
+
+CURRENT = 'CURRENT'
+META = 'meta.json'
+
+
+def create_version(root: Path) -> Path:
+    version = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    path = Path(root) / version
+    path.mkdir(parents=True)
+    return path
+
+
+def current_version(root: Path):
+    try:
+        return (Path(root) / CURRENT).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(root: Path, version: str):
+    tmp_path = Path(root) / f'.{CURRENT}.{os.getpid()}.tmp'
+    tmp_path.write_text(version)
+    os.replace(tmp_path, Path(root) / CURRENT)
+
+
+def prune(root: Path, keep: int):
+    current = current_version(root)
+    versions = sorted(
+        path for path in Path(root).iterdir()
+        if path.is_dir() and path.name != current
+    )
+    for path in versions[:max(len(versions) - keep + 1, 0)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def write_meta(path: Path, meta: dict):
+    (Path(path) / META).write_text(json.dumps(meta))
+
+
+def read_meta(path: Path) -> dict:
+    return json.loads((Path(path) / META).read_text())
+
+
+def write_array(path: Path, name: str, array: np.ndarray):
+    np.save(Path(path) / f'{name}.npy', np.ascontiguousarray(array), allow_pickle=False)
+
+
+def read_array(path: Path, name: str) -> np.ndarray:
+    return np.load(Path(path) / f'{name}.npy', mmap_mode='r', allow_pickle=False)
+
+
+def write_csr(path: Path, name: str, matrix: sp.csr_matrix):
+    write_array(path, f'{name}.data', matrix.data)
+    write_array(path, f'{name}.indices', matrix.indices)
+    write_array(path, f'{name}.indptr', matrix.indptr)
+
+
+def read_csr(path: Path, name: str, shape) -> sp.csr_matrix:
+    return sp.csr_matrix(
+        (
+            read_array(path, f'{name}.data'),
+            read_array(path, f'{name}.indices'),
+            read_array(path, f'{name}.indptr'),
+        ),
+        shape=tuple(shape),
+        copy=False
+    )
@@ -0,0 +1,47 @@
+import csv
+import json
+
+from .ml_engine import get_engine
+
+BATCH_FORMATS = ('jsonl', 'csv')
+
+
+def write_jsonl(results, stream, algorithm: str) -> int:
+    written = 0
+    for user_id, product_ids, scores in results:
+        stream.write(json.dumps({
+            'user_id': user_id,
+            'algorithm': algorithm,
+            'recommendations': [
+                {'product_id': product_id, 'score': round(float(score), 6)}
+                for product_id, score in zip(product_ids.tolist(), scores.tolist())
+            ],
+        }))
+        stream.write('\n')
+        written += 1
+    return written
+
+
+def write_csv(results, stream, algorithm: str) -> int:
+    writer = csv.writer(stream)
+    writer.writerow(['user_id', 'algorithm', 'rank', 'product_id', 'score'])
+    written = 0
+    for user_id, product_ids, scores in results:
+        writer.writerows(
+            [user_id, algorithm, rank, product_id, round(float(score), 6)]
+            for rank, (product_id, score) in enumerate(zip(product_ids.tolist(), scores.tolist()))
+        )
+        written += 1
+    return written
+
+
+def export_recommendations(user_ids, stream, algorithm: str = 'hybrid', limit: int = 10,
+                           output_format: str = 'jsonl', chunk_size: int = 1024, engine=None) -> int:
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f'Unsupported format: {output_format}')
+
+    engine = engine or get_engine()
+    results = engine.recommend_batch(user_ids, algorithm, limit, chunk_size)
+    if output_format == 'csv':
+        return write_csv(results, stream, algorithm)
+    return write_jsonl(results, stream, algorithm)
@@ -0,0 +1,287 @@
+import copy
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from shop.models import Product
+from shop.search import SEARCH_MODES, search_products
+from .. import ml_engine, similarity
+from ..pipeline import training_workers
+from ..history import history_writer
+from ..views import similar_products
+from .synthetic import VOCABULARY, generate_dataset
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCHMARK_ALGORITHMS = ('collaborative', 'content', 'hybrid', 'popular')
+PERCENTILES = (50, 95, 99)
+
+
+def process_rss(pid) -> int:
+    with open(f'/proc/{pid}/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def process_tree(pid: int) -> list:
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    tree, pending = [], [pid]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, ()))
+    return tree
+
+
+def current_rss() -> int:
+    try:
+        total = process_rss('self')
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        return sum(
+            resource.getrusage(who).ru_maxrss * 1024 for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+        )
+
+    for pid in process_tree(os.getpid())[1:]:
+        try:
+            total += process_rss(pid)
+        except (OSError, ValueError, IndexError):
+            pass
+    return total
+
+
+class PeakMemory:
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name='benchmark-memory', daemon=True)
+
+    def sample(self):
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, current_rss())
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def sqlite_database(path: Path) -> dict:
+    return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)}
+
+
+def use_database(database: dict, database_url: str = None):
+    history_writer.drain()
+    connections.close_all()
+    default = settings.DATABASES['default']
+    default.clear()
+    default.update(copy.deepcopy(database))
+    connections.configure_settings({'default': default})
+    del connections['default']
+
+    if database_url is None:
+        os.environ.pop('DATABASE_URL', None)
+    else:
+        os.environ['DATABASE_URL'] = database_url
+
+
+def latency_summary(samples) -> dict:
+    samples = np.asarray(samples) * 1000
+    summary = {f'p{percentile}_ms': float(np.percentile(samples, percentile)) for percentile in PERCENTILES}
+    summary.update(mean_ms=float(samples.mean()), max_ms=float(samples.max()), queries=len(samples))
+    return summary
+
+
+def measure(func, args_list, warmup: int = 5) -> dict:
+    for args in args_list[:warmup]:
+        func(*args)
+
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+def measure_latency(dataset: dict, queries: int, limit: int, rng: np.random.Generator) -> dict:
+    user_ids = rng.choice(dataset['user_ids'], size=queries).tolist()
+    users_by_id = User.objects.in_bulk(set(user_ids))
+    users = [users_by_id[user_id] for user_id in user_ids]
+    latency = {
+        algorithm: measure(ml_engine.get_recommendations, [(user, algorithm, limit) for user in users])
+        for algorithm in BENCHMARK_ALGORITHMS
+    }
+
+    factory = RequestFactory()
+    product_ids = [dataset['product_ids'][index] for index in rng.integers(0, dataset['products'], size=queries)]
+    latency['similar_products'] = measure(
+        lambda product_id: similar_products(factory.get(f'/recommendations/similar/{product_id}/'), product_id),
+        [(product_id,) for product_id in product_ids]
+    )
+
+    terms = [' '.join(rng.choice(VOCABULARY, size=rng.integers(1, 3))) for _ in range(queries)]
+    for mode in SEARCH_MODES:
+        latency[f'search:{mode}'] = measure(
+            lambda query: list(search_products(Product.objects.filter(available=True), query, mode)[:24]),
+            [(query,) for query in terms]
+        )
+    return latency
+
+
+def run_size(n_interactions: int, workdir: Path, options: dict) -> dict:
+    database = workdir / f'benchmark-{n_interactions}.sqlite3'
+    database.unlink(missing_ok=True)
+    use_database(sqlite_database(database), f'sqlite:///{database}')
+    call_command('migrate', verbosity=0)
+
+    started = time.perf_counter()
+    dataset = generate_dataset(
+        n_interactions,
+        n_users=options['users'],
+        n_products=options['products'],
+        n_categories=options['categories'],
+        exponent=options['exponent'],
+        seed=options['seed']
+    )
+    generate_seconds = time.perf_counter() - started
+
+    engine = ml_engine.RecommendationEngine(options['trainer'])
+    with PeakMemory() as memory:
+        started = time.perf_counter()
+        engine.train_models(save=True)
+        train_seconds = time.perf_counter() - started
+    ml_engine.publish_engine(engine)
+
+    latency = measure_latency(dataset, options['queries'], options['limit'], np.random.default_rng(options['seed']))
+    history_writer.drain()
+
+    if not options['keep']:
+        connections.close_all()
+        database.unlink(missing_ok=True)
+
+    return {
+        'interactions': dataset['interactions'],
+        'users': dataset['users'],
+        'products': dataset['products'],
+        'categories': dataset['categories'],
+        'generate_seconds': generate_seconds,
+        'train_seconds': train_seconds,
+        'train_peak_rss_mb': memory.peak / 2 ** 20,
+        'training_workers': training_workers(),
+        'stage_timings': engine.stage_timings,
+        'latency': latency,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sizes, options: dict, report=print) -> dict:
+    workdir = Path(options['workdir'] or tempfile.mkdtemp(prefix='recommendation-benchmark-'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    database = copy.deepcopy(settings.DATABASES['default'])
+    database_url = os.environ.get('DATABASE_URL')
+
+    results = {
+        'created_at': timezone.now().isoformat(),
+        'revision': git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'compiled_kernels': similarity.fast_similarity is not None,
+        },
+        'config': {
+            'trainer': options['trainer'],
+            'training_workers': settings.RECOMMENDATION_TRAINING_WORKERS,
+            'precompute': settings.RECOMMENDATION_PRECOMPUTE,
+            'use_rollup': settings.RECOMMENDATION_USE_ROLLUP,
+            'seed': options['seed'],
+            'exponent': options['exponent'],
+            'queries': options['queries'],
+            'limit': options['limit'],
+        },
+        'runs': [],
+    }
+
+    try:
+        with override_settings(
+            RECOMMENDATION_ARTIFACT_DIR=str(workdir / 'artifacts'),
+            RECOMMENDATION_ROLLUP_LAG=0
+        ):
+            for n_interactions in sizes:
+                report(f'Benchmarking {n_interactions} interactions...')
+                run = run_size(n_interactions, workdir, options)
+                results['runs'].append(run)
+                report(
+                    f"  trained in {run['train_seconds']:.2f}s (peak {run['train_peak_rss_mb']:.0f} MB), "
+                    + ', '.join(f"{name} p95 {stats['p95_ms']:.1f}ms" for name, stats in run['latency'].items())
+                )
+    finally:
+        use_database(database, database_url)
+
+    return results
+
+
+def compare_results(baseline: dict, current: dict):
+    baseline_runs = {run['interactions']: run for run in baseline['runs']}
+    comparison = []
+    for run in current['runs']:
+        previous = baseline_runs.get(run['interactions'])
+        if previous is None:
+            continue
+        comparison.append({
+            'interactions': run['interactions'],
+            'train_seconds_ratio': run['train_seconds'] / max(previous['train_seconds'], 1e-9),
+            'p95_ratio': {
+                name: stats['p95_ms'] / max(previous['latency'][name]['p95_ms'], 1e-9)
+                for name, stats in run['latency'].items() if name in previous['latency']
+            },
+        })
+    return comparison
+
+
+def write_results(results: dict, path: Path):
+    Path(path).write_text(json.dumps(results, indent=2, default=str))
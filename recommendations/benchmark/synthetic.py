@@ -0,0 +1,128 @@
+import uuid
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from shop.models import Category, Product, UserInteraction
+from shop.catalog_cache import bump_catalog_version
+from shop.search import rebuild_search_index
+
+INTERACTION_MIX = {
+    'view': 0.75,
+    'add_to_cart': 0.1,
+    'like': 0.06,
+    'purchase': 0.06,
+    'dislike': 0.03,
+}
+
+VOCABULARY = (
+    'cotton silk leather steel wooden ceramic organic wireless portable smart classic premium compact '
+    'handmade vintage modern ergonomic waterproof lightweight durable spicy herbal natural digital '
+    'kurta saree sneaker laptop phone speaker novel cookbook mixer kettle lamp rug tent racket bat '
+    'ball lipstick serum shampoo masala tea coffee rice atta puzzle doll robot blocks'
+).split()
+
+
+def power_law_weights(n: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def deterministic_uuids(n: int, rng: np.random.Generator):
+    return [uuid.UUID(bytes=bytes(row), version=4) for row in rng.integers(0, 256, size=(n, 16), dtype=np.uint8)]
+
+
+def default_sizes(n_interactions: int, n_users: int = None, n_products: int = None):
+    n_users = n_users or int(np.clip(n_interactions // 20, 100, 500000))
+    n_products = n_products or int(np.clip(n_interactions // 100, 200, 100000))
+    return n_users, n_products
+
+
+def generate_catalog(n_products: int, n_categories: int, rng: np.random.Generator, batch_size: int = 5000):
+    categories = Category.objects.bulk_create([
+        Category(name=f'Benchmark Category {index}', slug=f'benchmark-category-{index}')
+        for index in range(n_categories)
+    ])
+    topics = [rng.choice(VOCABULARY, size=8, replace=False) for _ in categories]
+    product_ids = deterministic_uuids(n_products, rng)
+    category_codes = rng.integers(0, n_categories, size=n_products)
+    prices = np.round(rng.lognormal(6.5, 1.0, size=n_products), 2)
+    ratings = np.round(rng.uniform(1, 5, size=n_products), 1)
+
+    for start in range(0, n_products, batch_size):
+        products = []
+        for index in range(start, min(start + batch_size, n_products)):
+            words = rng.choice(topics[category_codes[index]], size=4)
+            products.append(Product(
+                id=product_ids[index],
+                name=f'{words[0].title()} {words[1].title()} {index}',
+                slug=f'benchmark-product-{index}',
+                category=categories[category_codes[index]],
+                description=' '.join(rng.choice(VOCABULARY, size=12)) + ' ' + ' '.join(words),
+                price=float(prices[index]),
+                stock=int(rng.integers(0, 500)),
+                rating=float(ratings[index]),
+                tags=','.join(words[2:]),
+            ))
+        Product.objects.bulk_create(products)
+
+    rebuild_search_index()
+    bump_catalog_version()
+    return product_ids
+
+
+def generate_users(n_users: int, batch_size: int = 5000):
+    password = make_password(None)
+    for start in range(0, n_users, batch_size):
+        User.objects.bulk_create([
+            User(username=f'benchmark_user_{index}', password=password)
+            for index in range(start, min(start + batch_size, n_users))
+        ])
+    return np.asarray(
+        User.objects.filter(username__startswith='benchmark_user_').order_by('id').values_list('id', flat=True),
+        dtype=np.int64
+    )
+
+
+def generate_interactions(n_interactions: int, user_ids: np.ndarray, product_ids, rng: np.random.Generator,
+                          exponent: float = 1.1, batch_size: int = 50000) -> int:
+    product_weights = power_law_weights(len(product_ids), exponent, rng)
+    user_weights = power_law_weights(len(user_ids), exponent * 0.8, rng)
+    types = np.asarray(list(INTERACTION_MIX))
+    type_weights = np.asarray(list(INTERACTION_MIX.values()))
+
+    for start in range(0, n_interactions, batch_size):
+        size = min(batch_size, n_interactions - start)
+        users = user_ids[rng.choice(len(user_ids), size=size, p=user_weights)]
+        products = rng.choice(len(product_ids), size=size, p=product_weights)
+        interaction_types = types[rng.choice(len(types), size=size, p=type_weights)]
+        with transaction.atomic():
+            UserInteraction.objects.bulk_create([
+                UserInteraction(user_id=int(user_id), product_id=product_ids[product], interaction_type=interaction_type)
+                for user_id, product, interaction_type in zip(users, products, interaction_types)
+            ])
+    return n_interactions
+
+
+def generate_dataset(n_interactions: int, n_users: int = None, n_products: int = None, n_categories: int = 20,
+                     exponent: float = 1.1, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    n_users, n_products = default_sizes(n_interactions, n_users, n_products)
+
+    with transaction.atomic():
+        product_ids = generate_catalog(n_products, n_categories, rng)
+        user_ids = generate_users(n_users)
+    generate_interactions(n_interactions, user_ids, product_ids, rng, exponent)
+
+    return {
+        'interactions': n_interactions,
+        'users': n_users,
+        'products': n_products,
+        'categories': n_categories,
+        'exponent': exponent,
+        'seed': seed,
+        'user_ids': user_ids,
+        'product_ids': product_ids,
+    }
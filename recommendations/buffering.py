@@ -0,0 +1,252 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MemoryQueue:
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def trim(self) -> int:
+        overflow = len(self.items) - self.max_pending
+        if overflow > 0:
+            del self.items[:overflow]
+            return overflow
+        return 0
+
+    def put(self, items) -> int:
+        self.items.extend(items)
+        return self.trim()
+
+    def take(self, max_items: int):
+        items, self.items = self.items[:max_items], self.items[max_items:]
+        return items
+
+    def ack(self):
+        pass
+
+    def restore(self, items) -> int:
+        self.items[:0] = items
+        return self.trim()
+
+    def reset(self):
+        self.items = []
+
+
+class SpoolQueue:
+
+    def __init__(self, directory, name: str):
+        self.directory = Path(directory)
+        self.name = name
+        self.pending = 0
+        self.taken = []
+
+    def __len__(self):
+        return self.pending
+
+    def spool_path(self) -> Path:
+        return self.directory / f'{self.name}.{os.getpid()}.spool'
+
+    def claimed_path(self, created: int, offset: int) -> Path:
+        return self.directory / f'{self.name}.{created}.{offset}.{os.getpid()}.claimed'
+
+    def claimed_position(self, path: Path):
+        parts = path.name[len(self.name) + 1:].split('.')
+        if len(parts) == 3:
+            return int(parts[0]), 0
+        return int(parts[0]), int(parts[1])
+
+    def put(self, items) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.spool_path(), 'a') as spool:
+            spool.write(''.join(json.dumps(item) + '\n' for item in items))
+        self.pending += len(items)
+        return 0
+
+    def claim(self) -> list:
+        pid = os.getpid()
+        claimed = []
+        for path in self.directory.glob(f'{self.name}.*'):
+            owner = path.name.split('.')[-2]
+            if not owner.isdigit() or (int(owner) != pid and process_alive(int(owner))):
+                continue
+            if path.suffix == '.spool':
+                target = self.claimed_path(time.time_ns(), 0)
+            elif int(owner) != pid:
+                target = self.claimed_path(*self.claimed_position(path))
+            else:
+                claimed.append(path)
+                continue
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            claimed.append(target)
+        return sorted(claimed, key=self.claimed_position)
+
+    def decode(self, line: bytes, path: Path):
+        try:
+            return json.loads(line)
+        except ValueError:
+            logger.warning('Skipping undecodable line in %s: %r', path, line[:200])
+            return None
+
+    def take(self, max_items: int):
+        items = []
+        self.taken = []
+        for path in self.claim():
+            if len(items) >= max_items:
+                break
+            created, offset = self.claimed_position(path)
+            with open(path, 'rb') as spool:
+                spool.seek(offset)
+                while len(items) < max_items:
+                    line = spool.readline()
+                    if not line:
+                        break
+                    offset += len(line)
+                    item = self.decode(line, path) if line.strip() else None
+                    if item is not None:
+                        items.append(item)
+                exhausted = offset >= os.fstat(spool.fileno()).st_size
+            self.taken.append((path, created, offset, exhausted))
+
+        self.pending = max(self.pending - len(items), 0)
+        return items
+
+    def ack(self):
+        for path, created, offset, exhausted in self.taken:
+            if exhausted:
+                path.unlink(missing_ok=True)
+            else:
+                os.rename(path, self.claimed_path(created, offset))
+        self.taken = []
+
+    def restore(self, items) -> int:
+        self.taken = []
+        return 0
+
+    def reset(self):
+        self.pending = 0
+        self.taken = []
+
+
+class BufferedWriter:
+
+    def __init__(self, flush_func, max_size: int = 500, flush_interval: float = 5.0,
+                 max_pending: int = None, queue=None, name: str = 'buffered-writer'):
+        self.flush_func = flush_func
+        self.max_size = max(1, max_size)
+        self.flush_interval = flush_interval
+        self.queue = queue if queue is not None else MemoryQueue(max_pending or self.max_size * 20)
+        self.name = name
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = os.getpid()
+        self.closed = False
+        self.stats = {'added': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'errors': 0, 'flush_seconds': 0.0}
+        atexit.register(self.close)
+
+    def add(self, item):
+        self.extend([item])
+
+    def extend(self, items):
+        with self.lock:
+            if os.getpid() != self.pid:
+                self.pid = os.getpid()
+                self.queue.reset()
+                self.thread = None
+
+            self.stats['dropped'] += self.queue.put(items)
+            self.stats['added'] += len(items)
+            full = len(self.queue) >= self.max_size
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+
+        if full:
+            self.wakeup.set()
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                while self.flush() >= self.max_size:
+                    pass
+            finally:
+                connection.close()
+
+    def flush(self) -> int:
+        with self.flush_lock:
+            started = time.perf_counter()
+            items = []
+            try:
+                with self.lock:
+                    items = self.queue.take(self.max_size)
+                    if not items:
+                        self.queue.ack()
+                        return 0
+                self.flush_func(items)
+            except Exception:
+                with self.lock:
+                    self.stats['errors'] += 1
+                    self.stats['dropped'] += self.queue.restore(items)
+                return 0
+
+            with self.lock:
+                self.queue.ack()
+                self.stats['written'] += len(items)
+                self.stats['flushes'] += 1
+                self.stats['flush_seconds'] += time.perf_counter() - started
+            return len(items)
+
+    def drain(self) -> int:
+        written = 0
+        while True:
+            flushed = self.flush()
+            if not flushed:
+                return written
+            written += flushed
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.queue)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats, pending=len(self.queue))
+        stats['rows_per_second'] = stats['written'] / stats['flush_seconds'] if stats['flush_seconds'] else None
+        return stats
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.flush_interval + 5)
+        self.drain()
@@ -1,65 +1,237 @@
-# cython: language_level=3, boundscheck=False, wraparound=False, nonecheck=False
+# cython: language_level=3, boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+import os
 import numpy as np
+import scipy.sparse as sp
 cimport numpy as cnp
 cimport cython
+from cython.parallel cimport parallel, prange
 from libc.math cimport sqrt, fabs
+from libc.stdlib cimport malloc, free
 
 ctypedef cnp.float64_t DTYPE_t
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-def cosine_similarity_optimized(cnp.ndarray[DTYPE_t, ndim=2] X, cnp.ndarray[DTYPE_t, ndim=2] Y=None):
-    cdef int n_samples_X = X.shape[0]
-    cdef int n_features = X.shape[1]
-    cdef int n_samples_Y
-    cdef cnp.ndarray[DTYPE_t, ndim=2] similarities
-    cdef cnp.ndarray[DTYPE_t, ndim=1] norms_X, norms_Y
-    cdef DTYPE_t dot_product, norm_x, norm_y
-    cdef int i, j, k
-    cdef bint same_matrix = False
-    
+def csr_operands(X):
+    X = sp.csr_matrix(X)
+    X.sum_duplicates()
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1), dtype=np.float64).ravel())
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return (
+        np.ascontiguousarray(X.data, dtype=np.float64),
+        np.ascontiguousarray(X.indices, dtype=np.int32),
+        np.ascontiguousarray(X.indptr, dtype=np.int32),
+        inverse_norms,
+        X
+    )
+
+def transposed_operands(X):
+    X_t = X.T.tocsr()
+    return (
+        np.ascontiguousarray(X_t.data, dtype=np.float64),
+        np.ascontiguousarray(X_t.indices, dtype=np.int32),
+        np.ascontiguousarray(X_t.indptr, dtype=np.int32)
+    )
+
+cdef inline bint better(double score_a, int index_a, double score_b, int index_b) noexcept nogil:
+    return score_a > score_b or (score_a == score_b and index_a < index_b)
+
+cdef int heap_push(double* heap_scores, int* heap_indices, int size, int k, double score, int index) noexcept nogil:
+    cdef int position, parent, child
+
+    if size < k:
+        position = size
+        while position > 0:
+            parent = (position - 1) // 2
+            if not better(heap_scores[parent], heap_indices[parent], score, index):
+                break
+            heap_scores[position] = heap_scores[parent]
+            heap_indices[position] = heap_indices[parent]
+            position = parent
+        heap_scores[position] = score
+        heap_indices[position] = index
+        return size + 1
+
+    if not better(score, index, heap_scores[0], heap_indices[0]):
+        return size
+
+    position = 0
+    while True:
+        child = 2 * position + 1
+        if child >= k:
+            break
+        if child + 1 < k and better(heap_scores[child], heap_indices[child], heap_scores[child + 1], heap_indices[child + 1]):
+            child += 1
+        if not better(score, index, heap_scores[child], heap_indices[child]):
+            break
+        heap_scores[position] = heap_scores[child]
+        heap_indices[position] = heap_indices[child]
+        position = child
+    heap_scores[position] = score
+    heap_indices[position] = index
+    return size
+
+cdef void top_k_row(int row, int n_items, int k,
+                    const double* data, const int* indices, const int* indptr,
+                    const double* t_data, const int* t_indices, const int* t_indptr,
+                    const double* inverse_norms,
+                    double* accumulator, int* stamp, int* touched,
+                    double* heap_scores, int* heap_indices,
+                    int* out_indices, float* out_scores) noexcept nogil:
+    cdef int n_touched = 0
+    cdef int size = 0
+    cdef int p, q, feature, item, a, b, best_index
+    cdef double value, best_score
+
+    stamp[row] = row
+    for p in range(indptr[row], indptr[row + 1]):
+        feature = indices[p]
+        value = data[p]
+        for q in range(t_indptr[feature], t_indptr[feature + 1]):
+            item = t_indices[q]
+            if stamp[item] != row:
+                stamp[item] = row
+                accumulator[item] = 0.0
+                touched[n_touched] = item
+                n_touched += 1
+            accumulator[item] += value * t_data[q]
+
+    for a in range(n_touched):
+        item = touched[a]
+        size = heap_push(heap_scores, heap_indices, size, k, accumulator[item] * inverse_norms[row] * inverse_norms[item], item)
+
+    for item in range(n_items):
+        if stamp[item] == row:
+            continue
+        if size == k and not better(0.0, item, heap_scores[0], heap_indices[0]):
+            break
+        size = heap_push(heap_scores, heap_indices, size, k, 0.0, item)
+
+    for a in range(1, size):
+        best_score = heap_scores[a]
+        best_index = heap_indices[a]
+        b = a - 1
+        while b >= 0 and better(best_score, best_index, heap_scores[b], heap_indices[b]):
+            heap_scores[b + 1] = heap_scores[b]
+            heap_indices[b + 1] = heap_indices[b]
+            b -= 1
+        heap_scores[b + 1] = best_score
+        heap_indices[b + 1] = best_index
+
+    for a in range(size):
+        out_indices[a] = heap_indices[a]
+        out_scores[a] = <float> heap_scores[a]
+
+def top_k_similarities(X, int k, rows=None, int num_threads=0):
+    data_array, indices_array, indptr_array, inverse_norms_array, X = csr_operands(X)
+    t_data_array, t_indices_array, t_indptr_array = transposed_operands(X)
+
+    cdef int n_items = X.shape[0]
+    rows_array = np.arange(n_items, dtype=np.int32) if rows is None else np.ascontiguousarray(rows, dtype=np.int32)
+    cdef int n_rows = len(rows_array)
+    k = min(k, n_items - 1)
+    top_indices = np.zeros((n_rows, max(k, 0)), dtype=np.int32)
+    top_values = np.zeros((n_rows, max(k, 0)), dtype=np.float32)
+    if k <= 0 or n_rows == 0:
+        return top_indices, top_values
+
+    cdef const double[::1] data = data_array
+    cdef const int[::1] indices = indices_array
+    cdef const int[::1] indptr = indptr_array
+    cdef const double[::1] t_data = t_data_array
+    cdef const int[::1] t_indices = t_indices_array
+    cdef const int[::1] t_indptr = t_indptr_array
+    cdef const double[::1] inverse_norms = inverse_norms_array
+    cdef const int[::1] query_rows = rows_array
+    cdef int[:, ::1] out_indices = top_indices
+    cdef float[:, ::1] out_scores = top_values
+
+    cdef double* accumulator
+    cdef int* stamp
+    cdef int* touched
+    cdef double* heap_scores
+    cdef int* heap_indices
+    cdef int position, item
+    cdef int threads = num_threads if num_threads > 0 else (os.cpu_count() or 1)
+
+    with nogil, parallel(num_threads=threads):
+        accumulator = <double*> malloc(n_items * sizeof(double))
+        stamp = <int*> malloc(n_items * sizeof(int))
+        touched = <int*> malloc(n_items * sizeof(int))
+        heap_scores = <double*> malloc(k * sizeof(double))
+        heap_indices = <int*> malloc(k * sizeof(int))
+        for item in range(n_items):
+            stamp[item] = -1
+
+        for position in prange(n_rows, schedule='dynamic', chunksize=64):
+            top_k_row(
+                query_rows[position], n_items, k,
+                &data[0], &indices[0], &indptr[0],
+                &t_data[0], &t_indices[0], &t_indptr[0],
+                &inverse_norms[0],
+                accumulator, stamp, touched, heap_scores, heap_indices,
+                &out_indices[position, 0], &out_scores[position, 0]
+            )
+
+        free(accumulator)
+        free(stamp)
+        free(touched)
+        free(heap_scores)
+        free(heap_indices)
+
+    return top_indices, top_values
+
+cdef void cosine_row(int row, int n_columns,
+                     const double* data, const int* indices, const int* indptr,
+                     const double* t_data, const int* t_indices, const int* t_indptr,
+                     const double* inverse_norms_x, const double* inverse_norms_y,
+                     double* out) noexcept nogil:
+    cdef int p, q, feature, column
+    cdef double value
+
+    for p in range(indptr[row], indptr[row + 1]):
+        feature = indices[p]
+        value = data[p]
+        for q in range(t_indptr[feature], t_indptr[feature + 1]):
+            out[t_indices[q]] += value * t_data[q]
+
+    for column in range(n_columns):
+        out[column] *= inverse_norms_x[row] * inverse_norms_y[column]
+
+def cosine_similarity_optimized(X, Y=None, int num_threads=0):
+    data_array, indices_array, indptr_array, inverse_norms_x_array, X = csr_operands(X)
     if Y is None:
-        Y = X
-        same_matrix = True
-        n_samples_Y = n_samples_X
+        Y, inverse_norms_y_array = X, inverse_norms_x_array
     else:
-        n_samples_Y = Y.shape[0]
-    
-    norms_X = np.zeros(n_samples_X, dtype=np.float64)
-    norms_Y = np.zeros(n_samples_Y, dtype=np.float64)
-    
-    for i in range(n_samples_X):
-        norm_x = 0.0
-        for k in range(n_features):
-            norm_x += X[i, k] * X[i, k]
-        norms_X[i] = sqrt(norm_x)
-    
-    if not same_matrix:
-        for j in range(n_samples_Y):
-            norm_y = 0.0
-            for k in range(n_features):
-                norm_y += Y[j, k] * Y[j, k]
-            norms_Y[j] = sqrt(norm_y)
-    else:
-        norms_Y = norms_X
-    
-    similarities = np.zeros((n_samples_X, n_samples_Y), dtype=np.float64)
-    
-    for i in range(n_samples_X):
-        for j in range(n_samples_Y):
-            if same_matrix and j < i:
-                similarities[i, j] = similarities[j, i]
-                continue
-                
-            dot_product = 0.0
-            for k in range(n_features):
-                dot_product += X[i, k] * Y[j, k]
-            
-            if norms_X[i] != 0.0 and norms_Y[j] != 0.0:
-                similarities[i, j] = dot_product / (norms_X[i] * norms_Y[j])
-            else:
-                similarities[i, j] = 0.0
-    
+        _, _, _, inverse_norms_y_array, Y = csr_operands(Y)
+    t_data_array, t_indices_array, t_indptr_array = transposed_operands(Y)
+
+    cdef int n_rows = X.shape[0]
+    cdef int n_columns = Y.shape[0]
+    similarities = np.zeros((n_rows, n_columns), dtype=np.float64)
+    if n_rows == 0 or n_columns == 0 or X.nnz == 0 or Y.nnz == 0:
+        return similarities
+
+    cdef const double[::1] data = data_array
+    cdef const int[::1] indices = indices_array
+    cdef const int[::1] indptr = indptr_array
+    cdef const double[::1] t_data = t_data_array
+    cdef const int[::1] t_indices = t_indices_array
+    cdef const int[::1] t_indptr = t_indptr_array
+    cdef const double[::1] inverse_norms_x = inverse_norms_x_array
+    cdef const double[::1] inverse_norms_y = inverse_norms_y_array
+    cdef double[:, ::1] out = similarities
+    cdef int row
+    cdef int threads = num_threads if num_threads > 0 else (os.cpu_count() or 1)
+
+    with nogil, parallel(num_threads=threads):
+        for row in prange(n_rows, schedule='dynamic', chunksize=64):
+            cosine_row(
+                row, n_columns,
+                &data[0], &indices[0], &indptr[0],
+                &t_data[0], &t_indices[0], &t_indptr[0],
+                &inverse_norms_x[0], &inverse_norms_y[0],
+                &out[row, 0]
+            )
+
     return similarities
 
 @cython.boundscheck(False)
@@ -72,29 +244,29 @@ def euclidean_distance_optimized(cnp.ndarray[DTYPE_t, ndim=2] X, cnp.ndarray[DTY
     cdef DTYPE_t diff, dist
     cdef int i, j, k
     cdef bint same_matrix = False
-    
+
     if Y is None:
         Y = X
         same_matrix = True
         n_samples_Y = n_samples_X
     else:
         n_samples_Y = Y.shape[0]
-    
+
     distances = np.zeros((n_samples_X, n_samples_Y), dtype=np.float64)
-    
+
     for i in range(n_samples_X):
         for j in range(n_samples_Y):
             if same_matrix and j < i:
                 distances[i, j] = distances[j, i]
                 continue
-                
+
             dist = 0.0
             for k in range(n_features):
                 diff = X[i, k] - Y[j, k]
                 dist += diff * diff
-            
+
             distances[i, j] = sqrt(dist)
-    
+
     return distances
 
 @cython.boundscheck(False)
@@ -106,67 +278,38 @@ def pearson_correlation_optimized(cnp.ndarray[DTYPE_t, ndim=2] X):
     cdef cnp.ndarray[DTYPE_t, ndim=1] means, stds
     cdef DTYPE_t mean_i, mean_j, std_i, std_j, covariance
     cdef int i, j, k
-    
+
     means = np.zeros(n_samples, dtype=np.float64)
     for i in range(n_samples):
         for k in range(n_features):
             means[i] += X[i, k]
         means[i] /= n_features
-    
+
     stds = np.zeros(n_samples, dtype=np.float64)
     for i in range(n_samples):
         for k in range(n_features):
             diff = X[i, k] - means[i]
             stds[i] += diff * diff
         stds[i] = sqrt(stds[i] / (n_features - 1))
-    
+
     correlations = np.zeros((n_samples, n_samples), dtype=np.float64)
-    
+
     for i in range(n_samples):
         for j in range(i, n_samples):
             if i == j:
                 correlations[i, j] = 1.0
                 continue
-                
+
             covariance = 0.0
             for k in range(n_features):
                 covariance += (X[i, k] - means[i]) * (X[j, k] - means[j])
             covariance /= (n_features - 1)
-            
+
             if stds[i] != 0.0 and stds[j] != 0.0:
                 correlations[i, j] = covariance / (stds[i] * stds[j])
                 correlations[j, i] = correlations[i, j]
             else:
                 correlations[i, j] = 0.0
                 correlations[j, i] = 0.0
-    
-    return correlations
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-def top_k_similarities(cnp.ndarray[DTYPE_t, ndim=2] similarity_matrix, int k):
-    cdef int n_items = similarity_matrix.shape[0]
-    cdef cnp.ndarray[cnp.int32_t, ndim=2] top_indices
-    cdef cnp.ndarray[DTYPE_t, ndim=2] top_values
-    cdef cnp.ndarray[cnp.int32_t, ndim=1] sorted_indices
-    cdef int i, j, actual_k
-    
-    actual_k = min(k, n_items - 1)
-    
-    top_indices = np.zeros((n_items, actual_k), dtype=np.int32)
-    top_values = np.zeros((n_items, actual_k), dtype=np.float64)
-    
-    for i in range(n_items):
-        row = similarity_matrix[i, :]
-        sorted_indices = np.argsort(row)[::-1]
-        
-        j = 0
-        count = 0
-        while count < actual_k and j < n_items:
-            if sorted_indices[j] != i:
-                top_indices[i, count] = sorted_indices[j]
-                top_values[i, count] = row[sorted_indices[j]]
-                count += 1
-            j += 1
-    
-    return top_indices, top_values
+    return correlations
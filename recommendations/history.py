@@ -0,0 +1,47 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .buffering import BufferedWriter
+from .models import RecommendationHistory
+
+
+def write_history(entries):
+    histories = [
+        RecommendationHistory(user_id=user_id, algorithm_used=algorithm)
+        for user_id, algorithm, _ in entries
+    ]
+    Through = RecommendationHistory.recommended_products.through
+
+    with transaction.atomic():
+        RecommendationHistory.objects.bulk_create(histories)
+        Through.objects.bulk_create(
+            [
+                Through(recommendationhistory_id=history.id, product_id=product_id)
+                for history, (_, _, product_ids) in zip(histories, entries)
+                for product_id in dict.fromkeys(product_ids)
+            ],
+            ignore_conflicts=True
+        )
+
+
+history_writer = BufferedWriter(
+    write_history,
+    max_size=settings.RECOMMENDATION_HISTORY_BATCH_SIZE,
+    flush_interval=settings.RECOMMENDATION_HISTORY_FLUSH_INTERVAL,
+    name='recommendation-history'
+)
+
+
+def log_recommendations(user: User, algorithm: str, products) -> bool:
+    if not settings.RECOMMENDATION_HISTORY_ENABLED or not products:
+        return False
+
+    sample_rate = settings.RECOMMENDATION_HISTORY_SAMPLE_RATE
+    if sample_rate < 1 and random.random() >= sample_rate:
+        return False
+
+    history_writer.add((user.id, algorithm, [product.id for product in products]))
+    return True
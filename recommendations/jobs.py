@@ -0,0 +1,105 @@
+import multiprocessing
+import threading
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import TrainingJob
+from .pipeline import setup_training_process
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+executor = None
+executor_lock = threading.RLock()
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            if settings.RECOMMENDATION_TRAINING_EXECUTOR == 'process':
+                executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=setup_training_process
+                )
+            else:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recommendation-training')
+        return executor
+
+
+def run_training_job(job_id, in_process: bool):
+    from .ml_engine import RecommendationEngine
+
+    TrainingJob.objects.filter(pk=job_id).update(status='running', started_at=timezone.now())
+    engine = RecommendationEngine()
+    engine.train_models(save=None if in_process else True)
+    return engine if in_process else engine.artifact_version
+
+
+def finish_training_job(job_id, future):
+    global executor
+    from .ml_engine import RecommendationEngine, publish_engine
+
+    try:
+        result = future.result()
+        if isinstance(result, RecommendationEngine):
+            engine = result
+        else:
+            engine = RecommendationEngine.from_artifacts(Path(settings.RECOMMENDATION_ARTIFACT_DIR) / result)
+        publish_engine(engine)
+
+        TrainingJob.objects.filter(pk=job_id).update(
+            status='succeeded',
+            artifact_version=engine.artifact_version or '',
+            stage_timings=engine.stage_timings,
+            finished_at=timezone.now()
+        )
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            with executor_lock:
+                executor = None
+        TrainingJob.objects.filter(pk=job_id).update(
+            status='failed',
+            error=str(e) or e.__class__.__name__,
+            finished_at=timezone.now()
+        )
+    finally:
+        connection.close()
+
+
+def lock_training_jobs():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {TrainingJob._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+
+    stale_before = timezone.now() - timedelta(seconds=settings.RECOMMENDATION_TRAINING_JOB_TIMEOUT)
+    TrainingJob.objects.filter(status__in=ACTIVE_STATUSES, created_at__lt=stale_before).update(
+        status='failed',
+        error='Timed out',
+        finished_at=timezone.now()
+    )
+
+
+def submit_training_job(job_id):
+    in_process = settings.RECOMMENDATION_TRAINING_EXECUTOR != 'process'
+    future = get_executor().submit(run_training_job, job_id, in_process)
+    future.add_done_callback(partial(finish_training_job, job_id))
+
+
+def start_retraining(requested_by=None) -> TrainingJob:
+    with executor_lock, transaction.atomic():
+        lock_training_jobs()
+        job = TrainingJob.objects.filter(status__in=ACTIVE_STATUSES).first()
+        if job is not None:
+            return job
+
+        job = TrainingJob.objects.create(requested_by=requested_by)
+        transaction.on_commit(partial(submit_training_job, job.id))
+        return job
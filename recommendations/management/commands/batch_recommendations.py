@@ -0,0 +1,64 @@
+import sys
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.batch import BATCH_FORMATS, export_recommendations
+from recommendations.ml_engine import RECOMMENDATION_ALGORITHMS, RecommendationEngine, get_engine
+
+
+class Command(BaseCommand):
+    help = 'Export recommendations for many users at once as JSONL or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help='Comma-separated user ids')
+        parser.add_argument('--users-file', help='File with one user id per line')
+        parser.add_argument('--algorithm', default='hybrid', choices=RECOMMENDATION_ALGORITHMS + ('popular',))
+        parser.add_argument('--limit', type=int, default=10, help='Recommendations per user')
+        parser.add_argument('--format', default='jsonl', choices=BATCH_FORMATS)
+        parser.add_argument('--output', help='Output file (defaults to stdout)')
+        parser.add_argument('--chunk-size', type=int, default=1024, help='Users scored per batch')
+
+    def handle(self, *args, **options):
+        if options['users']:
+            user_ids = [int(user_id) for user_id in options['users'].split(',') if user_id.strip()]
+        elif options['users_file']:
+            with open(options['users_file']) as users_file:
+                user_ids = [int(line) for line in users_file if line.strip()]
+        else:
+            user_ids = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+
+        if not user_ids:
+            raise CommandError('No users to export recommendations for')
+
+        engine = get_engine()
+        if engine.user_factors is None:
+            self.stderr.write('No trained model found, training one now...')
+            engine = RecommendationEngine()
+            engine.train_models(precompute=False, save=False)
+
+        stream = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        started = time.perf_counter()
+        try:
+            written = export_recommendations(
+                np.asarray(user_ids, dtype=np.int64),
+                stream,
+                algorithm=options['algorithm'],
+                limit=options['limit'],
+                output_format=options['format'],
+                chunk_size=options['chunk_size'],
+                engine=engine
+            )
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            self.style.SUCCESS(
+                f'Exported recommendations for {written} users in {elapsed:.2f}s '
+                f'({written / max(elapsed, 1e-9):.0f} users/s)'
+            )
+        )
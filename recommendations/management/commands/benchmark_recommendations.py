@@ -0,0 +1,49 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.benchmark.runner import compare_results, run_benchmark, write_results
+from recommendations.ml_engine import COLLABORATIVE_TRAINERS
+
+
+class Command(BaseCommand):
+    help = 'Benchmark training and serving on reproducible synthetic data of increasing size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000', help='Comma-separated interaction counts to benchmark')
+        parser.add_argument('--users', type=int, help='Users per dataset (defaults to interactions / 20)')
+        parser.add_argument('--products', type=int, help='Products per dataset (defaults to interactions / 100)')
+        parser.add_argument('--categories', type=int, default=20, help='Categories per dataset')
+        parser.add_argument('--exponent', type=float, default=1.1, help='Power-law exponent for product popularity')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+        parser.add_argument('--queries', type=int, default=200, help='Timed requests per algorithm')
+        parser.add_argument('--limit', type=int, default=10, help='Recommendations per request')
+        parser.add_argument('--trainer', choices=COLLABORATIVE_TRAINERS, default=None, help='Collaborative trainer')
+        parser.add_argument('--workdir', help='Directory for the benchmark databases (defaults to a temp dir)')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated databases')
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results')
+        parser.add_argument('--baseline', help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if not sizes:
+            raise CommandError('No sizes to benchmark')
+
+        options['trainer'] = options['trainer'] or settings.RECOMMENDATION_COLLABORATIVE_TRAINER
+        results = run_benchmark(sizes, options, report=self.stdout.write)
+        write_results(results, options['output'])
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            for row in compare_results(baseline, results):
+                self.stdout.write(
+                    f"{row['interactions']} interactions: train x{row['train_seconds_ratio']:.2f}, "
+                    + ', '.join(f'{name} p95 x{ratio:.2f}' for name, ratio in row['p95_ratio'].items())
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote results for {len(results['runs'])} sizes to {options['output']}"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations import als
+from recommendations.similarity import check_kernels
+
+
+class Command(BaseCommand):
+    help = 'Check that the compiled similarity and ALS kernels agree with the pure Python fallback'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=500, help='Rows in the random sparse matrix')
+        parser.add_argument('--features', type=int, default=200, help='Columns in the random sparse matrix')
+        parser.add_argument('--density', type=float, default=0.05, help='Fraction of non-zero entries')
+        parser.add_argument('--k', type=int, default=20, help='Neighbours per row for top-k')
+        parser.add_argument('--seeds', type=int, default=3, help='Number of random matrices to check')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            results = [
+                check_kernels(options['items'], options['features'], options['density'], options['k'], seed=seed)
+                for seed in range(options['seeds'])
+            ]
+            als_results = [als.check_kernels(seed=seed) for seed in range(options['seeds'])]
+        except ImportError as error:
+            raise CommandError(str(error))
+
+        for seed, (result, als_result) in enumerate(zip(results, als_results)):
+            self.stdout.write(
+                f"seed {seed}: cosine max error {result['cosine_max_error']:.2e}, "
+                f"top-k max error {result['top_k_max_error']:.2e}, "
+                f"mismatched neighbours {result['top_k_mismatched_neighbours']}, "
+                f"ALS max error {als_result['als_max_error']:.2e}"
+            )
+
+        if not all(result['agree'] for result in results + als_results):
+            raise CommandError('Compiled kernels disagree with the Python fallback')
+        self.stdout.write(
+            self.style.SUCCESS(f'Kernels agree on {len(results)} matrices in {time.perf_counter() - started:.2f}s')
+        )
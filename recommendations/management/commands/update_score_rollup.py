@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommendations.rollup import rebuild_score_rollup, rollup_watermark, update_score_rollup
+
+
+class Command(BaseCommand):
+    help = 'Fold new interactions into the user-product score rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute the rollup from the full interaction log')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['rebuild']:
+            applied = rebuild_score_rollup()
+        else:
+            applied = update_score_rollup()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Applied {applied} interactions in {time.perf_counter() - started:.2f}s '
+                f'(watermark: {rollup_watermark()})'
+            )
+        )
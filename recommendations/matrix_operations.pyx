@@ -1,44 +1,107 @@
-# cython: language_level=3, boundscheck=False, wraparound=False, nonecheck=False
+# cython: language_level=3, boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+import os
 import numpy as np
 cimport numpy as cnp
 cimport cython
+from cython.parallel cimport parallel, prange
 from libc.math cimport sqrt, fabs
+from libc.stdlib cimport malloc, free
 
 ctypedef cnp.float64_t DTYPE_t
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-def matrix_factorization_sgd(cnp.ndarray[DTYPE_t, ndim=2] R, int K, double alpha, double beta, int iterations):
-    cdef int n_users = R.shape[0]
-    cdef int n_items = R.shape[1]
-    cdef cnp.ndarray[DTYPE_t, ndim=2] P = np.random.normal(scale=1./K, size=(n_users, K))
-    cdef cnp.ndarray[DTYPE_t, ndim=2] Q = np.random.normal(scale=1./K, size=(n_items, K))
-    cdef cnp.ndarray[DTYPE_t, ndim=2] Q_T = Q.T
-    
-    cdef double error, prediction
-    cdef double p_ik_old, q_kj_old
-    cdef int i, j, k, iteration
-    cdef double rating
-    
-    for iteration in range(iterations):
-        for i in range(n_users):
-            for j in range(n_items):
-                rating = R[i, j]
-                if rating > 0:
-                    prediction = 0.0
-                    for k in range(K):
-                        prediction += P[i, k] * Q[j, k]
-                    
-                    error = rating - prediction
-                    
-                    for k in range(K):
-                        p_ik_old = P[i, k]
-                        q_kj_old = Q[j, k]
-                        
-                        P[i, k] += alpha * (error * q_kj_old - beta * p_ik_old)
-                        Q[j, k] += alpha * (error * p_ik_old - beta * q_kj_old)
-    
-    return P, Q
+cdef inline double dot(const double* a, const double* b, int n) noexcept nogil:
+    cdef double total = 0.0
+    cdef int k
+    for k in range(n):
+        total += a[k] * b[k]
+    return total
+
+cdef void gramian_product(const double* gramian, const double* vector, double* out, int n) noexcept nogil:
+    cdef int a, b
+    for a in range(n):
+        out[a] = 0.0
+        for b in range(n):
+            out[a] += gramian[a * n + b] * vector[b]
+
+cdef void least_squares_cg_row(int row, int n_factors, int cg_steps,
+                               const int* indptr, const int* indices, const double* data,
+                               double* x, const double* Y, const double* gramian,
+                               double* r, double* p, double* Ap) noexcept nogil:
+    cdef int index, item, step, k
+    cdef double confidence, preference, weight, rsold, rsnew, alpha
+
+    gramian_product(gramian, x, r, n_factors)
+    for k in range(n_factors):
+        r[k] = -r[k]
+
+    for index in range(indptr[row], indptr[row + 1]):
+        item = indices[index]
+        confidence = data[index]
+        preference = 1.0
+        if confidence < 0:
+            confidence = -confidence
+            preference = 0.0
+        weight = confidence * preference - (confidence - 1.0) * dot(&Y[item * n_factors], x, n_factors)
+        for k in range(n_factors):
+            r[k] += weight * Y[item * n_factors + k]
+
+    for k in range(n_factors):
+        p[k] = r[k]
+    rsold = dot(r, r, n_factors)
+    if rsold < 1e-20:
+        return
+
+    for step in range(cg_steps):
+        gramian_product(gramian, p, Ap, n_factors)
+        for index in range(indptr[row], indptr[row + 1]):
+            item = indices[index]
+            confidence = fabs(data[index])
+            weight = (confidence - 1.0) * dot(&Y[item * n_factors], p, n_factors)
+            for k in range(n_factors):
+                Ap[k] += weight * Y[item * n_factors + k]
+
+        alpha = rsold / dot(p, Ap, n_factors)
+        for k in range(n_factors):
+            x[k] += alpha * p[k]
+            r[k] -= alpha * Ap[k]
+
+        rsnew = dot(r, r, n_factors)
+        if rsnew < 1e-20:
+            break
+        for k in range(n_factors):
+            p[k] = r[k] + (rsnew / rsold) * p[k]
+        rsold = rsnew
+
+def least_squares_cg(const int[::1] indptr, const int[::1] indices, const double[::1] data,
+                     double[:, ::1] X, const double[:, ::1] Y, const double[:, ::1] gramian,
+                     int cg_steps=3, int num_threads=0):
+    cdef int n_rows = X.shape[0]
+    cdef int n_factors = X.shape[1]
+    cdef int threads = num_threads if num_threads > 0 else (os.cpu_count() or 1)
+    cdef double* r
+    cdef double* p
+    cdef double* Ap
+    cdef int row
+
+    if n_rows == 0 or n_factors == 0 or Y.shape[0] == 0:
+        return
+
+    with nogil, parallel(num_threads=threads):
+        r = <double*> malloc(n_factors * sizeof(double))
+        p = <double*> malloc(n_factors * sizeof(double))
+        Ap = <double*> malloc(n_factors * sizeof(double))
+
+        for row in prange(n_rows, schedule='dynamic', chunksize=64):
+            least_squares_cg_row(
+                row, n_factors, cg_steps,
+                &indptr[0], &indices[0] if indices.shape[0] else NULL, &data[0] if data.shape[0] else NULL,
+                &X[row, 0], &Y[0, 0], &gramian[0, 0],
+                r, p, Ap
+            )
+
+        free(r)
+        free(p)
+        free(Ap)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0004_userproductscore_rollupwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,89 +1,455 @@
+import copy
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Count
+from django.utils import timezone
 from shop.models import Product, UserInteraction
-from .models import UserProfile, RecommendationHistory
+from .models import UserProfile, PrecomputedRecommendation
+from .history import log_recommendations
+from .ann import RandomProjectionIndex
+from .similarity import top_k_similarities
+from .als import implicit_als, solve_user_factors
+from .pipeline import train_stages, training_workers
+from . import artifacts
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
 from typing import List
 
-try:
-    from .fast_similarity import cosine_similarity_optimized as cython_cosine
-    CYTHON_SIM_AVAILABLE = True
-except Exception:
-    CYTHON_SIM_AVAILABLE = False
+INTERACTION_WEIGHTS = {
+    'view': 1.0,
+    'like': 3.0,
+    'dislike': -2.0,
+    'add_to_cart': 2.0,
+    'purchase': 5.0
+}
+
+CONTENT_INTERACTION_TYPES = ['like', 'purchase', 'add_to_cart']
+
+RECOMMENDATION_ALGORITHMS = ('collaborative', 'content', 'hybrid')
+
+COLLABORATIVE_TRAINERS = ('svd', 'als')
+
+EXACT_SIMILARITY_BLOCK = 2 ** 24
+
+HYBRID_WEIGHTS = {
+    'collaborative': 0.4,
+    'content': 0.4,
+    'popular': 0.2
+}
+
+def interaction_weights(type_col) -> np.ndarray:
+    type_codes, types = pd.factorize(pd.Series(type_col))
+    type_weights = np.array([INTERACTION_WEIGHTS.get(t, 1.0) for t in types], dtype=np.float32)
+    return type_weights[type_codes]
+
+def content_interactions(type_col) -> np.ndarray:
+    return pd.Series(type_col).isin(CONTENT_INTERACTION_TYPES).to_numpy()
+
+def interaction_decay(timestamps, now) -> np.ndarray:
+    half_life_days = settings.RECOMMENDATION_SCORE_HALF_LIFE_DAYS
+    if not half_life_days:
+        return np.ones(len(timestamps), dtype=np.float32)
+    
+    ages = np.asarray((pd.Timestamp(now) - pd.to_datetime(list(timestamps), utc=True)).total_seconds())
+    return np.exp2(-np.maximum(ages, 0) / (half_life_days * 86400)).astype(np.float32)
+
+def normalize_rows(factors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(factors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (factors / norms).astype(np.float32)
+
+def top_n(candidates: np.ndarray, scores: np.ndarray, n: int):
+    if n <= 0:
+        return candidates[:0], scores[:0]
+    if len(candidates) > n:
+        threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+        keep = scores >= threshold
+        candidates, scores = candidates[keep], scores[keep]
+    order = np.lexsort((candidates, -scores))[:n]
+    return candidates[order], scores[order]
+
+def top_k_columns(scores: np.ndarray, k: int, block_size: int = 256):
+    n_rows, n_cols = scores.shape
+    if -(-n_cols // block_size) <= k:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return top, np.take_along_axis(scores, top, axis=1)
+    
+    maxima = np.maximum.reduceat(scores, np.arange(0, n_cols, block_size), axis=1)
+    blocks = np.argpartition(-maxima, k - 1, axis=1)[:, :k]
+    columns = (blocks[:, :, None] * block_size + np.arange(block_size)).reshape(n_rows, -1)
+    valid = columns < n_cols
+    columns = np.minimum(columns, n_cols - 1)
+    values = np.where(valid, np.take_along_axis(scores, columns, axis=1), -np.inf)
+    
+    top = np.argpartition(-values, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(columns, top, axis=1), np.take_along_axis(values, top, axis=1)
+
+def row_top_n(scores: sp.csr_matrix, i: int, n: int):
+    row = slice(scores.indptr[i], scores.indptr[i + 1])
+    return top_n(scores.indices[row].astype(np.int64), scores.data[row], n)
+
+def normalize_scores(scores: np.ndarray) -> np.ndarray:
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores):
+        return scores
+    
+    low, high = scores.min(), scores.max()
+    if high - low <= 0:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+def fuse_scores(sources, weights, n: int):
+    items = np.concatenate([np.asarray(source_items, dtype=np.int64) for source_items, _ in sources])
+    if not len(items):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    
+    scores = np.concatenate([
+        normalize_scores(source_scores) * weight
+        for (_, source_scores), weight in zip(sources, weights)
+    ])
+    candidates, inverse = np.unique(items, return_inverse=True)
+    return top_n(candidates, np.bincount(inverse, weights=scores), n)
 
 class RecommendationEngine:
     
-    def __init__(self):
+    def __init__(self, collaborative_trainer: str = None):
+        collaborative_trainer = collaborative_trainer or settings.RECOMMENDATION_COLLABORATIVE_TRAINER
+        if collaborative_trainer not in COLLABORATIVE_TRAINERS:
+            raise ValueError(f'Unsupported collaborative trainer: {collaborative_trainer}')
+        
+        self.collaborative_trainer = collaborative_trainer
         self.user_item_matrix = None
-        self.svd_model = None
-        self.product_features = None
+        self.positive_matrix = None
+        self.content_matrix = None
+        self.user_ids = None
+        self.user_order = None
+        self.product_ids = None
+        self.item_components = None
+        self.user_factors = None
+        self.user_index = None
+        self.interactions_until = None
+        self.folded_user_ids = None
+        self.folded_base_rows = None
+        self.folded_factors = None
+        self.folded_positive = None
+        self.folded_content = None
+        self.content_product_ids = None
         self.tfidf_vectorizer = None
-        self.content_similarity_matrix = None
-        
-    def prepare_user_item_matrix(self) -> np.ndarray:
-        interactions = UserInteraction.objects.select_related('user', 'product').all()
+        self.tfidf_matrix = None
+        self.tfidf_terms = None
+        self.content_neighbours = None
+        self.content_scores = None
+        self.popular_items = None
+        self.catalog_map = None
+        self.artifact_version = None
+        self.stage_timings = {}
+        
+    def load_interactions(self):
+        if settings.RECOMMENDATION_USE_ROLLUP:
+            from .rollup import load_score_rollup
+            return load_score_rollup()
+        
+        interactions_until = timezone.now()
+        interactions = list(
+            UserInteraction.objects.values_list('user_id', 'product_id', 'interaction_type', 'timestamp')
+        )
+        if not interactions:
+            return None
         
-        interaction_weights = {
-            'view': 1.0,
-            'like': 3.0,
-            'dislike': -2.0,
-            'add_to_cart': 2.0,
-            'purchase': 5.0
-        }
+        user_col, product_col, type_col, timestamps = zip(*interactions)
+        scores = interaction_weights(type_col) * interaction_decay(timestamps, interactions_until)
+        content_counts = content_interactions(type_col).astype(np.float32)
+        return user_col, product_col, scores, content_counts, interactions_until
+    
+    def prepare_user_item_matrix(self) -> sp.csr_matrix:
+        interactions = self.load_interactions()
+        if interactions is None:
+            return None
         
-        user_product_scores = {}
-        for interaction in interactions:
-            user_id = interaction.user.id
-            product_id = str(interaction.product.id)
-            weight = interaction_weights.get(interaction.interaction_type, 1.0)
-            
-            key = (user_id, product_id)
-            if key in user_product_scores:
-                user_product_scores[key] += weight
-            else:
-                user_product_scores[key] = weight
+        user_col, product_col, scores, content_counts, interactions_until = interactions
         
-        data = []
-        for (user_id, product_id), score in user_product_scores.items():
-            data.append({'user_id': user_id, 'product_id': product_id, 'score': score})
+        user_ids, user_codes = np.unique(np.array(user_col, dtype=np.int64), return_inverse=True)
+        product_codes, product_ids = pd.factorize(pd.Series(product_col).astype(str), sort=True)
         
-        if not data:
-            return None
-            
-        df = pd.DataFrame(data)
+        user_item_matrix = sp.csr_matrix(
+            (np.asarray(scores, dtype=np.float32), (user_codes, product_codes)),
+            shape=(len(user_ids), len(product_ids)),
+            dtype=np.float32
+        )
+        user_item_matrix.sum_duplicates()
+        user_item_matrix.eliminate_zeros()
         
-        user_item_matrix = df.pivot_table(
-            index='user_id', 
-            columns='product_id', 
-            values='score', 
-            fill_value=0
+        content_matrix = sp.csr_matrix(
+            (np.asarray(content_counts, dtype=np.float32), (user_codes, product_codes)),
+            shape=user_item_matrix.shape
         )
+        content_matrix.sum_duplicates()
+        content_matrix.eliminate_zeros()
         
+        self.user_ids = user_ids
+        self.user_order = np.arange(len(user_ids))
+        self.product_ids = np.asarray(product_ids, dtype=str)
         self.user_item_matrix = user_item_matrix
-        return user_item_matrix.values
+        self.content_matrix = content_matrix
+        self.interactions_until = interactions_until
+        return user_item_matrix
     
     def train_collaborative_filtering(self, n_components: int = 50):
         matrix = self.prepare_user_item_matrix()
         if matrix is None:
             return
             
-        self.svd_model = TruncatedSVD(n_components=min(n_components, matrix.shape[1]-1))
-        self.svd_model.fit(matrix)
+        if self.collaborative_trainer == 'als':
+            user_factors, item_factors = implicit_als(
+                matrix,
+                factors=settings.RECOMMENDATION_ALS_FACTORS,
+                regularization=settings.RECOMMENDATION_ALS_REGULARIZATION,
+                alpha=settings.RECOMMENDATION_ALS_ALPHA,
+                iterations=settings.RECOMMENDATION_ALS_ITERATIONS,
+                cg_steps=settings.RECOMMENDATION_ALS_CG_STEPS,
+                num_threads=settings.RECOMMENDATION_ALS_THREADS
+            )
+            self.user_factors = normalize_rows(user_factors)
+            self.item_components = np.ascontiguousarray(item_factors.T)
+        else:
+            svd_model = TruncatedSVD(n_components=min(n_components, matrix.shape[1]-1))
+            self.user_factors = normalize_rows(svd_model.fit_transform(matrix))
+            self.item_components = svd_model.components_.astype(np.float32)
+        self.positive_matrix = matrix.maximum(0).tocsr()
+        self.positive_matrix.eliminate_zeros()
+        self.user_index = self.build_user_index(self.user_factors)
     
-    def prepare_content_features(self):
-        products = Product.objects.filter(available=True)
+    def project_users(self, user_rows: sp.csr_matrix) -> np.ndarray:
+        if self.collaborative_trainer == 'als':
+            return normalize_rows(solve_user_factors(
+                user_rows,
+                self.item_components.T,
+                regularization=settings.RECOMMENDATION_ALS_REGULARIZATION,
+                alpha=settings.RECOMMENDATION_ALS_ALPHA,
+                num_threads=settings.RECOMMENDATION_ALS_THREADS
+            ))
+        return normalize_rows(np.asarray(user_rows @ self.item_components.T))
+    
+    def build_user_index(self, user_factors: np.ndarray):
+        if not settings.RECOMMENDATION_ANN or len(user_factors) < settings.RECOMMENDATION_ANN_MIN_USERS:
+            return None
+        
+        return RandomProjectionIndex(
+            n_tables=settings.RECOMMENDATION_ANN_TABLES,
+            n_bits=settings.RECOMMENDATION_ANN_BITS,
+            multiprobe=settings.RECOMMENDATION_ANN_MULTIPROBE
+        ).build(user_factors)
+    
+    def lookup_base_rows(self, user_ids) -> np.ndarray:
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if self.user_ids is None or not len(self.user_ids):
+            return np.full(len(user_ids), -1, dtype=np.int64)
+        
+        sorted_ids = self.user_ids[self.user_order]
+        positions = np.minimum(np.searchsorted(sorted_ids, user_ids), len(sorted_ids) - 1)
+        rows = self.user_order[positions]
+        return np.where(self.user_ids[rows] == user_ids, rows, -1)
+    
+    def lookup_user_rows(self, user_ids) -> np.ndarray:
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        rows = self.lookup_base_rows(user_ids)
+        if self.folded_user_ids is None or not len(self.folded_user_ids):
+            return rows
+        
+        positions = np.minimum(np.searchsorted(self.folded_user_ids, user_ids), len(self.folded_user_ids) - 1)
+        folded = self.folded_user_ids[positions] == user_ids
+        return np.where(folded, len(self.user_ids) + positions, rows)
+    
+    def user_data(self, rows: np.ndarray, base, folded):
+        rows = np.asarray(rows, dtype=np.int64)
+        side = rows >= len(self.user_ids)
+        if not side.any():
+            return base[rows]
+        
+        stack = sp.vstack if sp.issparse(base) else np.vstack
+        stacked = stack([base[rows[~side]], folded[rows[side] - len(self.user_ids)]])
+        order = np.argsort(np.concatenate([np.flatnonzero(~side), np.flatnonzero(side)]), kind='stable')
+        return stacked.tocsr()[order] if sp.issparse(stacked) else stacked[order]
+    
+    def row_user_ids(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        side = rows >= len(self.user_ids)
+        if not side.any():
+            return self.user_ids[rows]
+        
+        user_ids = np.empty(len(rows), dtype=np.int64)
+        user_ids[~side] = self.user_ids[rows[~side]]
+        user_ids[side] = self.folded_user_ids[rows[side] - len(self.user_ids)]
+        return user_ids
+    
+    def row_base_rows(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        side = rows >= len(self.user_ids)
+        if not side.any():
+            return rows
+        
+        base_rows = rows.copy()
+        base_rows[side] = self.folded_base_rows[rows[side] - len(self.user_ids)]
+        return base_rows
+    
+    def get_user_row(self, user_id: int):
+        row = self.lookup_user_rows([user_id])[0]
+        return int(row) if row >= 0 else None
+    
+    def build_user_rows(self, user_ids: np.ndarray):
+        interactions = list(
+            UserInteraction.objects.filter(user_id__in=user_ids.tolist())
+            .values_list('user_id', 'product_id', 'interaction_type', 'timestamp')
+        )
+        shape = (len(user_ids), len(self.product_ids))
+        if not interactions:
+            return sp.csr_matrix(shape, dtype=np.float32), sp.csr_matrix(shape, dtype=np.float32)
+        
+        user_col, product_col, type_col, timestamps = zip(*interactions)
+        weights = interaction_weights(type_col) * interaction_decay(timestamps, timezone.now())
+        rows = np.searchsorted(user_ids, np.array(user_col, dtype=np.int64))
+        product_col = np.array([str(product_id) for product_id in product_col])
+        cols = np.minimum(np.searchsorted(self.product_ids, product_col), len(self.product_ids) - 1)
+        known = self.product_ids[cols] == product_col
+        content = known & content_interactions(type_col)
+        
+        user_rows = sp.csr_matrix(
+            (weights[known], (rows[known], cols[known])),
+            shape=shape,
+            dtype=np.float32
+        )
+        user_rows.sum_duplicates()
+        
+        content_rows = sp.csr_matrix(
+            (np.ones(content.sum(), dtype=np.float32), (rows[content], cols[content])),
+            shape=shape
+        )
+        content_rows.sum_duplicates()
+        return user_rows, content_rows
+    
+    def fold_in_users(self, user_ids, precompute: bool = None) -> 'RecommendationEngine':
+        if self.user_factors is None:
+            return self
+        
+        user_ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+        if not len(user_ids):
+            return self
+        
+        new_rows, new_content = self.build_user_rows(user_ids)
+        active = np.diff(new_rows.indptr) > 0
+        if not active.any():
+            return self
+        folded_ids, new_rows, new_content = user_ids[active], new_rows[active], new_content[active]
+        new_factors = self.project_users(new_rows)
+        new_positive = new_rows.maximum(0).tocsr()
+        new_positive.eliminate_zeros()
+        new_content.eliminate_zeros()
+        
+        user_ids = folded_ids
+        if self.folded_user_ids is not None:
+            keep = ~np.isin(self.folded_user_ids, folded_ids)
+            user_ids = np.concatenate([self.folded_user_ids[keep], folded_ids])
+            new_factors = np.vstack([self.folded_factors[keep], new_factors])
+            new_positive = sp.vstack([self.folded_positive[keep], new_positive], format='csr')
+            new_content = sp.vstack([self.folded_content[keep], new_content], format='csr')
+        
+        order = np.argsort(user_ids, kind='stable')
+        engine = copy.copy(self)
+        engine.folded_user_ids = user_ids[order]
+        engine.folded_base_rows = self.lookup_base_rows(engine.folded_user_ids)
+        engine.folded_factors = new_factors[order]
+        engine.folded_positive = new_positive[order]
+        engine.folded_content = new_content[order]
+        
+        if precompute is None:
+            precompute = settings.RECOMMENDATION_PRECOMPUTE
+        if precompute:
+            engine.precompute_recommendations(user_rows=engine.lookup_user_rows(folded_ids))
+        
+        return engine
+    
+    def fold_in_new_interactions(self):
+        if self.user_factors is None or self.interactions_until is None:
+            return self, 0
+        
+        interactions_until = timezone.now()
+        user_ids = list(
+            UserInteraction.objects.filter(
+                timestamp__gte=self.interactions_until
+            ).values_list('user_id', flat=True).distinct()
+        )
+        
+        engine = self.fold_in_users(user_ids)
+        if engine is self:
+            engine = copy.copy(self)
+        engine.interactions_until = interactions_until
+        return engine, len(user_ids)
+    
+    def score_collaborative(self, user_rows: np.ndarray, n_neighbours: int = 20, exact: bool = False) -> sp.csr_matrix:
+        user_rows = np.asarray(user_rows, dtype=np.int64)
+        n_users = self.user_factors.shape[0]
+        k = min(n_neighbours, n_users - 1)
+        if k <= 0:
+            return sp.csr_matrix((len(user_rows), self.catalog_map.shape[1]), dtype=np.float32)
+        
+        queries = self.user_data(user_rows, self.user_factors, self.folded_factors)
+        base_rows = self.row_base_rows(user_rows)
+        if self.user_index is not None and not exact:
+            neighbours, neighbour_weights = self.user_index.query(queries, self.user_factors, k, exclude=base_rows)
+        else:
+            similarities = queries @ self.user_factors.T
+            in_base = base_rows >= 0
+            similarities[np.flatnonzero(in_base), base_rows[in_base]] = -np.inf
+            neighbours, neighbour_weights = top_k_columns(similarities, k)
+        
+        neighbour_matrix = sp.csr_matrix(
+            (neighbour_weights.ravel(), neighbours.ravel(), np.arange(0, len(user_rows) * k + 1, k)),
+            shape=(len(user_rows), n_users)
+        )
+        scores = (neighbour_matrix @ self.positive_matrix @ self.catalog_map).tocsr()
+        
+        seen = self.user_data(user_rows, self.positive_matrix, self.folded_positive) @ self.catalog_map
+        scores = scores - scores.multiply(seen.astype(bool))
+        scores.eliminate_zeros()
+        return scores
+    
+    def prepare_content_features(self, neighbours: bool = True) -> np.ndarray:
+        products = Product.objects.filter(available=True).annotate(
+            interaction_count=Count('interactions')
+        ).values_list(
+            'id', 'name', 'description', 'category__name', 'tags',
+            'popularity_score', 'rating', 'interaction_count'
+        )
         
         product_features = []
         product_ids = []
+        categories = []
+        popularity = []
         
-        for product in products:
-            features = f"{product.name} {product.description} {product.category.name} {product.tags}"
+        for product_id, name, description, category_name, tags, popularity_score, rating, interaction_count in products:
+            features = f"{name} {description} {category_name} {tags}"
             product_features.append(features)
-            product_ids.append(str(product.id))
+            product_ids.append(str(product_id))
+            categories.append(category_name)
+            popularity.append((popularity_score, rating, interaction_count))
+        
+        if not product_ids:
+            return None
+        
+        order = np.argsort(np.asarray(product_ids, dtype=str), kind='stable')
+        product_ids = np.asarray(product_ids, dtype=str)[order]
+        product_features = [product_features[i] for i in order]
+        categories = np.asarray(categories, dtype=str)[order]
+        popularity_score, rating, interaction_count = np.asarray(popularity, dtype=np.float64)[order].T
+        self.popular_items = np.lexsort((-interaction_count, -rating, -popularity_score))
         
         self.tfidf_vectorizer = TfidfVectorizer(
             max_features=1000,
@@ -91,88 +457,206 @@ class RecommendationEngine:
             ngram_range=(1, 2)
         )
         
-        tfidf_matrix = self.tfidf_vectorizer.fit_transform(product_features)
+        tfidf_matrix = self.tfidf_vectorizer.fit_transform(product_features).astype(np.float32)
         
-        if CYTHON_SIM_AVAILABLE:
-            dense = tfidf_matrix.toarray().astype(np.float64, copy=False)
-            self.content_similarity_matrix = cython_cosine(dense)
-        else:
-            self.content_similarity_matrix = cosine_similarity(tfidf_matrix)
-        
-        self.product_features = pd.DataFrame(
-            self.content_similarity_matrix,
-            index=product_ids,
-            columns=product_ids
-        )
+        if neighbours:
+            self.content_neighbours, self.content_scores = top_k_similarities(
+                tfidf_matrix,
+                settings.RECOMMENDATION_CONTENT_NEIGHBOURS
+            )
+        self.content_product_ids = product_ids
+        self.tfidf_matrix = tfidf_matrix
+        self.tfidf_terms = tfidf_matrix.T.tocsr()
+        return categories
     
-    def get_collaborative_recommendations(self, user: User, n_recommendations: int = 10) -> List[Product]:
-        if self.user_item_matrix is None or self.svd_model is None:
-            return []
-            
-        if user.id not in self.user_item_matrix.index:
-            return self.get_popular_products(n_recommendations)
-        
-        user_idx = list(self.user_item_matrix.index).index(user.id)
-        
-        user_vector = self.user_item_matrix.iloc[user_idx:user_idx+1].values
-        user_transformed = self.svd_model.transform(user_vector)
-        
-        all_products_transformed = self.svd_model.transform(self.user_item_matrix.values)
-        
-        similarities = cosine_similarity(user_transformed, all_products_transformed)[0]
+    def lookup_content_items(self, product_ids) -> np.ndarray:
+        product_ids = np.asarray([str(product_id) for product_id in product_ids], dtype=str)
+        if self.content_product_ids is None or not len(product_ids):
+            return np.full(len(product_ids), -1, dtype=np.int64)
         
-        similar_user_indices = np.argsort(similarities)[::-1][1:21]
-        
-        product_scores = {}
-        user_products = set(self.user_item_matrix.columns[self.user_item_matrix.iloc[user_idx] > 0])
-        
-        for similar_user_idx in similar_user_indices:
-            similar_user_products = self.user_item_matrix.iloc[similar_user_idx]
-            similarity_score = similarities[similar_user_idx]
-            
-            for product_id, score in similar_user_products.items():
-                if score > 0 and product_id not in user_products:
-                    if product_id not in product_scores:
-                        product_scores[product_id] = 0
-                    product_scores[product_id] += score * similarity_score
+        items = np.minimum(np.searchsorted(self.content_product_ids, product_ids), len(self.content_product_ids) - 1)
+        return np.where(self.content_product_ids[items] == product_ids, items, -1)
+    
+    def link_catalog(self):
+        if self.product_ids is None or self.content_product_ids is None:
+            self.catalog_map = None
+            return
         
-        top_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)[:n_recommendations]
+        items = self.lookup_content_items(self.product_ids)
+        known = items >= 0
+        self.catalog_map = sp.csr_matrix(
+            (np.ones(known.sum(), dtype=np.float32), (np.flatnonzero(known), items[known])),
+            shape=(len(self.product_ids), len(self.content_product_ids))
+        )
+    
+    def get_similar_product_ids(self, product_id, n: int = 10) -> List[str]:
+        item = self.lookup_content_items([product_id])[0]
+        if item < 0:
+            return None
         
-        product_ids = [product_id for product_id, _ in top_products]
-        return Product.objects.filter(id__in=product_ids, available=True)[:n_recommendations]
+        neighbours = self.content_neighbours[item]
+        return list(self.content_product_ids[neighbours[self.content_scores[item] > 0][:n]])
     
-    def get_content_based_recommendations(self, user: User, n_recommendations: int = 10) -> List[Product]:
-        if self.product_features is None:
-            return []
+    def search_product_ids(self, query: str, n: int = 10):
+        if self.tfidf_terms is None:
+            return None
         
-        user_interactions = UserInteraction.objects.filter(
-            user=user,
-            interaction_type__in=['like', 'purchase', 'add_to_cart']
-        ).select_related('product')
+        query_vector = self.tfidf_vectorizer.transform([query]).astype(np.float32)
+        scores = (query_vector @ self.tfidf_terms).tocsr()
+        items, scores = top_n(scores.indices.astype(np.int64), scores.data, n)
+        return list(self.content_product_ids[items]), scores
+    
+    def score_content(self, profiles: sp.csr_matrix) -> sp.csr_matrix:
+        n_items, k = self.content_neighbours.shape
+        similarity = sp.csr_matrix(
+            (self.content_scores.ravel(), self.content_neighbours.ravel(), np.arange(0, n_items * k + 1, k)),
+            shape=(n_items, n_items)
+        )
         
-        if not user_interactions.exists():
-            return self.get_popular_products(n_recommendations)
+        scores = (profiles @ similarity).tocsr()
+        scores = scores - scores.multiply(profiles.astype(bool))
+        scores.eliminate_zeros()
+        return scores
+    
+    def popular_candidates(self, n: int):
+        items = np.asarray(self.popular_items[:n], dtype=np.int64)
+        return items, (n - np.arange(len(items))) / n
+    
+    def popular_product_ids(self, n: int):
+        if self.popular_items is not None:
+            items, scores = self.popular_candidates(n)
+            return self.content_product_ids[items], scores
         
-        product_scores = {}
-        user_product_ids = set()
+        product_ids = np.array([str(product.id) for product in self.get_popular_products(n).only('id')])
+        return product_ids, (n - np.arange(len(product_ids))) / n
+    
+    def iter_recommendations(self, user_rows: np.ndarray, n: int, chunk_size: int = 256,
+                             algorithms=RECOMMENDATION_ALGORITHMS, exact: bool = False):
+        if not len(user_rows):
+            return
         
-        for interaction in user_interactions:
-            product_id = str(interaction.product.id)
-            user_product_ids.add(product_id)
+        pool = max(n, settings.RECOMMENDATION_CANDIDATE_POOL, settings.RECOMMENDATION_PRECOMPUTE_TOP_N)
+        popular = self.popular_candidates(pool)
+        weights = [HYBRID_WEIGHTS['collaborative'], HYBRID_WEIGHTS['content'], HYBRID_WEIGHTS['popular']]
+        use_collab = 'collaborative' in algorithms or 'hybrid' in algorithms
+        use_content = 'content' in algorithms or 'hybrid' in algorithms
+        if self.user_index is None or exact:
+            chunk_size = max(1, min(chunk_size, EXACT_SIMILARITY_BLOCK // len(self.user_factors)))
+        
+        for start in range(0, len(user_rows), chunk_size):
+            chunk = np.asarray(user_rows[start:start + chunk_size], dtype=np.int64)
+            if use_collab:
+                collab_scores = self.score_collaborative(chunk, exact=exact)
+            if use_content:
+                profiles = (self.user_data(chunk, self.content_matrix, self.folded_content) @ self.catalog_map).tocsr()
+                content_scores = self.score_content(profiles)
             
-            if product_id in self.product_features.index:
-                similar_products = self.product_features.loc[product_id].sort_values(ascending=False)
+            for i, user_row in enumerate(chunk):
+                ranked = {}
+                if use_collab:
+                    collab = row_top_n(collab_scores, i, pool)
+                    ranked['collaborative'] = (collab[0][:n], collab[1][:n])
+                if use_content:
+                    if profiles.indptr[i] == profiles.indptr[i + 1]:
+                        content = popular
+                    else:
+                        content = row_top_n(content_scores, i, pool)
+                    ranked['content'] = (content[0][:n], content[1][:n])
+                if 'hybrid' in algorithms:
+                    ranked['hybrid'] = fuse_scores([collab, content, popular], weights, n)
                 
-                for similar_product_id, similarity in similar_products.items():
-                    if similar_product_id != product_id and similar_product_id not in user_product_ids:
-                        if similar_product_id not in product_scores:
-                            product_scores[similar_product_id] = 0
-                        product_scores[similar_product_id] += similarity
-        
-        top_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)[:n_recommendations]
+                yield int(user_row), {algorithm: ranked[algorithm] for algorithm in algorithms}
+    
+    def recommend_batch(self, user_ids, algorithm: str = 'hybrid', n_recommendations: int = 10,
+                        chunk_size: int = 1024):
+        if algorithm not in RECOMMENDATION_ALGORITHMS:
+            algorithm = 'popular'
+        
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        popular_ids, popular_scores = self.popular_product_ids(n_recommendations)
+        trained = self.user_factors is not None and self.catalog_map is not None
+        
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            rows = self.lookup_user_rows(chunk) if trained and algorithm != 'popular' else np.full(len(chunk), -1)
+            ranked = dict(
+                self.iter_recommendations(
+                    np.unique(rows[rows >= 0]), n_recommendations, chunk_size, (algorithm,), exact=True
+                )
+            )
+            
+            for user_id, row in zip(chunk, rows):
+                if row < 0:
+                    yield int(user_id), popular_ids, popular_scores
+                    continue
+                items, scores = ranked[row][algorithm]
+                yield int(user_id), self.content_product_ids[items], scores
+    
+    def fetch_products(self, items: np.ndarray) -> List[Product]:
+        product_ids = list(self.content_product_ids[items])
+        products = Product.objects.filter(available=True).select_related('category').in_bulk(product_ids)
+        products = {str(product_id): product for product_id, product in products.items()}
+        return [products[product_id] for product_id in product_ids if product_id in products]
+    
+    def precompute_recommendations(self, n_recommendations: int = None, chunk_size: int = 256,
+                                   user_rows: np.ndarray = None) -> int:
+        if self.user_factors is None or self.catalog_map is None:
+            return 0
+        
+        full_run = user_rows is None
+        if full_run:
+            user_rows = np.arange(len(self.user_ids))
+        
+        n = n_recommendations or settings.RECOMMENDATION_PRECOMPUTE_TOP_N
+        
+        stored = 0
+        for start in range(0, len(user_rows), chunk_size):
+            chunk = user_rows[start:start + chunk_size]
+            records = []
+            for user_row, ranked in self.iter_recommendations(chunk, n, chunk_size):
+                user_id = int(self.row_user_ids([user_row])[0])
+                for algorithm, (items, scores) in ranked.items():
+                    records.extend(
+                        PrecomputedRecommendation(
+                            user_id=user_id,
+                            product_id=product_id,
+                            algorithm=algorithm,
+                            rank=rank,
+                            score=float(score)
+                        )
+                        for rank, (product_id, score) in enumerate(zip(self.content_product_ids[items], scores))
+                    )
+            
+            with transaction.atomic():
+                PrecomputedRecommendation.objects.filter(user_id__in=self.row_user_ids(chunk).tolist()).delete()
+                PrecomputedRecommendation.objects.bulk_create(records)
+            stored += len(chunk)
+        
+        if full_run:
+            PrecomputedRecommendation.objects.exclude(user_id__in=UserInteraction.objects.values('user_id')).delete()
+        return stored
+    
+    def get_user_recommendations(self, user: User, algorithm: str, n_recommendations: int = 10) -> List[Product]:
+        if self.user_factors is None or self.catalog_map is None:
+            return self.get_popular_products(n_recommendations) if algorithm == 'hybrid' else []
+        
+        user_row = self.get_user_row(user.id)
+        if user_row is None and settings.RECOMMENDATION_FOLD_IN_ON_DEMAND:
+            engine = self.fold_in_users([user.id], precompute=False)
+            if engine is not self:
+                publish_engine(engine, expected=self)
+                return engine.get_user_recommendations(user, algorithm, n_recommendations)
+        if user_row is None:
+            return self.get_popular_products(n_recommendations)
         
-        product_ids = [product_id for product_id, _ in top_products]
-        return Product.objects.filter(id__in=product_ids, available=True)[:n_recommendations]
+        _, ranked = next(self.iter_recommendations(np.array([user_row]), n_recommendations))
+        return self.fetch_products(ranked[algorithm][0])
+    
+    def get_collaborative_recommendations(self, user: User, n_recommendations: int = 10) -> List[Product]:
+        return self.get_user_recommendations(user, 'collaborative', n_recommendations)
+    
+    def get_content_based_recommendations(self, user: User, n_recommendations: int = 10) -> List[Product]:
+        return self.get_user_recommendations(user, 'content', n_recommendations)
     
     def get_popular_products(self, n_recommendations: int = 10) -> List[Product]:
         return Product.objects.filter(available=True).annotate(
@@ -180,70 +664,221 @@ class RecommendationEngine:
         ).order_by('-popularity_score', '-rating', '-interaction_count')[:n_recommendations]
     
     def get_hybrid_recommendations(self, user: User, n_recommendations: int = 10) -> List[Product]:
-        collab_recs = self.get_collaborative_recommendations(user, n_recommendations * 2)
-        content_recs = self.get_content_based_recommendations(user, n_recommendations * 2)
-        popular_recs = self.get_popular_products(n_recommendations)
-        
-        product_scores = {}
-        
-        for i, product in enumerate(collab_recs):
-            score = (len(collab_recs) - i) * 0.4
-            if product.id not in product_scores:
-                product_scores[product.id] = 0
-            product_scores[product.id] += score
-        
-        for i, product in enumerate(content_recs):
-            score = (len(content_recs) - i) * 0.4
-            if product.id not in product_scores:
-                product_scores[product.id] = 0
-            product_scores[product.id] += score
-        
-        for i, product in enumerate(popular_recs):
-            score = (len(popular_recs) - i) * 0.2
-            if product.id not in product_scores:
-                product_scores[product.id] = 0
-            product_scores[product.id] += score
-        
-        top_product_ids = sorted(product_scores.keys(), key=lambda x: product_scores[x], reverse=True)
-        
-        products = []
-        for product_id in top_product_ids[:n_recommendations]:
-            try:
-                product = Product.objects.get(id=product_id, available=True)
-                products.append(product)
-            except Product.DoesNotExist:
-                continue
-        
-        return products
-    
-    def train_models(self):
-        self.train_collaborative_filtering()
-        self.prepare_content_features()
+        return self.get_user_recommendations(user, 'hybrid', n_recommendations)
+    
+    def train_models(self, precompute: bool = None, save: bool = None, workers: int = None):
+        started = time.perf_counter()
+        self.stage_timings = train_stages(self, workers or training_workers())
+        
+        stage_started = time.perf_counter()
+        self.link_catalog()
+        self.stage_timings['link_catalog'] = time.perf_counter() - stage_started
+        
+        if precompute is None:
+            precompute = settings.RECOMMENDATION_PRECOMPUTE
+        if precompute:
+            stage_started = time.perf_counter()
+            self.precompute_recommendations()
+            self.stage_timings['precompute'] = time.perf_counter() - stage_started
+        self.stage_timings['total'] = time.perf_counter() - started
+        
+        if save is None:
+            save = settings.RECOMMENDATION_ARTIFACTS
+        if save:
+            stage_started = time.perf_counter()
+            self.save_artifacts()
+            self.stage_timings['save_artifacts'] = time.perf_counter() - stage_started
+    
+    def save_artifacts(self, root: Path = None) -> Path:
+        root = Path(root or settings.RECOMMENDATION_ARTIFACT_DIR)
+        path = artifacts.create_version(root)
+        meta = {
+            'interactions_until': self.interactions_until.isoformat() if self.interactions_until else None,
+            'collaborative': None,
+            'user_index': None,
+            'content': None,
+            'stage_timings': self.stage_timings,
+        }
+        
+        if self.user_factors is not None:
+            artifacts.write_array(path, 'user_ids', self.user_ids)
+            artifacts.write_array(path, 'user_order', self.user_order)
+            artifacts.write_array(path, 'product_ids', self.product_ids)
+            artifacts.write_array(path, 'user_factors', self.user_factors)
+            artifacts.write_array(path, 'item_components', self.item_components)
+            artifacts.write_csr(path, 'user_item_matrix', self.user_item_matrix)
+            artifacts.write_csr(path, 'positive_matrix', self.positive_matrix)
+            artifacts.write_csr(path, 'content_matrix', self.content_matrix)
+            meta['collaborative'] = {'shape': list(self.user_item_matrix.shape), 'trainer': self.collaborative_trainer}
+        
+        if self.user_index is not None:
+            artifacts.write_array(path, 'user_index.planes', self.user_index.planes)
+            artifacts.write_array(path, 'user_index.sorted_codes', self.user_index.sorted_codes)
+            artifacts.write_array(path, 'user_index.sorted_rows', self.user_index.sorted_rows)
+            meta['user_index'] = {
+                'n_tables': self.user_index.n_tables,
+                'n_bits': self.user_index.n_bits,
+                'multiprobe': self.user_index.multiprobe,
+                'seed': self.user_index.seed,
+            }
+        
+        if self.content_neighbours is not None:
+            artifacts.write_array(path, 'content_product_ids', self.content_product_ids)
+            artifacts.write_array(path, 'content_neighbours', self.content_neighbours)
+            artifacts.write_array(path, 'content_scores', self.content_scores)
+            artifacts.write_array(path, 'popular_items', self.popular_items)
+            artifacts.write_array(path, 'tfidf_idf', self.tfidf_vectorizer.idf_.astype(np.float64))
+            artifacts.write_csr(path, 'tfidf_matrix', self.tfidf_matrix)
+            params = self.tfidf_vectorizer.get_params()
+            meta['content'] = {
+                'shape': list(self.tfidf_matrix.shape),
+                'vectorizer': {
+                    'max_features': params['max_features'],
+                    'stop_words': params['stop_words'],
+                    'ngram_range': list(params['ngram_range']),
+                    'vocabulary': {term: int(index) for term, index in self.tfidf_vectorizer.vocabulary_.items()},
+                },
+            }
+        
+        artifacts.write_meta(path, meta)
+        artifacts.publish(root, path.name)
+        artifacts.prune(root, settings.RECOMMENDATION_ARTIFACT_KEEP)
+        self.artifact_version = path.name
+        return path
+    
+    @classmethod
+    def from_artifacts(cls, path: Path) -> 'RecommendationEngine':
+        path = Path(path)
+        meta = artifacts.read_meta(path)
+        engine = cls(meta['collaborative'] and meta['collaborative'].get('trainer', 'svd'))
+        
+        engine.stage_timings = meta.get('stage_timings', {})
+        if meta['interactions_until']:
+            engine.interactions_until = datetime.fromisoformat(meta['interactions_until'])
+        
+        if meta['collaborative']:
+            shape = meta['collaborative']['shape']
+            engine.user_ids = artifacts.read_array(path, 'user_ids')
+            engine.user_order = artifacts.read_array(path, 'user_order')
+            engine.product_ids = artifacts.read_array(path, 'product_ids')
+            engine.user_factors = artifacts.read_array(path, 'user_factors')
+            engine.item_components = artifacts.read_array(path, 'item_components')
+            engine.user_item_matrix = artifacts.read_csr(path, 'user_item_matrix', shape)
+            engine.positive_matrix = artifacts.read_csr(path, 'positive_matrix', shape)
+            engine.content_matrix = artifacts.read_csr(path, 'content_matrix', shape)
+        
+        if meta['user_index']:
+            user_index = RandomProjectionIndex(**meta['user_index'])
+            user_index.planes = artifacts.read_array(path, 'user_index.planes')
+            user_index.sorted_codes = artifacts.read_array(path, 'user_index.sorted_codes')
+            user_index.sorted_rows = artifacts.read_array(path, 'user_index.sorted_rows')
+            engine.user_index = user_index
+        
+        if meta['content']:
+            vectorizer = meta['content']['vectorizer']
+            engine.tfidf_vectorizer = TfidfVectorizer(
+                max_features=vectorizer['max_features'],
+                stop_words=vectorizer['stop_words'],
+                ngram_range=tuple(vectorizer['ngram_range']),
+                vocabulary=vectorizer['vocabulary']
+            )
+            engine.tfidf_vectorizer.idf_ = np.array(artifacts.read_array(path, 'tfidf_idf'))
+            engine.tfidf_matrix = artifacts.read_csr(path, 'tfidf_matrix', meta['content']['shape'])
+            engine.tfidf_terms = engine.tfidf_matrix.T.tocsr()
+            engine.content_product_ids = artifacts.read_array(path, 'content_product_ids')
+            engine.content_neighbours = artifacts.read_array(path, 'content_neighbours')
+            engine.content_scores = artifacts.read_array(path, 'content_scores')
+            engine.popular_items = artifacts.read_array(path, 'popular_items')
+        
+        engine.link_catalog()
+        engine.artifact_version = path.name
+        return engine
 
 recommendation_engine = RecommendationEngine()
 
+publish_lock = threading.Lock()
+artifact_lock = threading.Lock()
+artifact_checked_at = None
+
+def publish_engine(engine: RecommendationEngine, expected: RecommendationEngine = None) -> bool:
+    global recommendation_engine
+    
+    with publish_lock:
+        if expected is not None and recommendation_engine is not expected:
+            return False
+        recommendation_engine = engine
+        return True
+
+def get_engine() -> RecommendationEngine:
+    load_latest_artifacts()
+    return recommendation_engine
+
+def load_latest_artifacts():
+    global artifact_checked_at
+    
+    now = time.monotonic()
+    if artifact_checked_at is not None and now - artifact_checked_at < settings.RECOMMENDATION_ARTIFACT_CHECK_INTERVAL:
+        return
+    
+    with artifact_lock:
+        if artifact_checked_at is not None and now - artifact_checked_at < settings.RECOMMENDATION_ARTIFACT_CHECK_INTERVAL:
+            return
+        artifact_checked_at = now
+        
+        root = Path(settings.RECOMMENDATION_ARTIFACT_DIR)
+        version = artifacts.current_version(root)
+        if version is None or version == recommendation_engine.artifact_version:
+            return
+        
+        try:
+            loaded = RecommendationEngine.from_artifacts(root / version)
+        except (OSError, ValueError, KeyError):
+            return
+        publish_engine(loaded)
+
+def get_precomputed_recommendations(user: User, algorithm: str = 'hybrid', limit: int = 10) -> List[Product]:
+    if algorithm not in ('collaborative', 'content'):
+        algorithm = 'hybrid'
+    
+    return list(
+        Product.objects.filter(
+            precomputed_recommendations__user=user,
+            precomputed_recommendations__algorithm=algorithm,
+            available=True
+        ).select_related('category').order_by('precomputed_recommendations__rank')[:limit]
+    )
+
+def get_live_recommendations(user: User, algorithm: str = 'hybrid', limit: int = 10) -> List[Product]:
+    engine = get_engine()
+    if algorithm == 'collaborative':
+        return engine.get_collaborative_recommendations(user, limit)
+    elif algorithm == 'content':
+        return engine.get_content_based_recommendations(user, limit)
+    elif algorithm == 'popular':
+        return engine.get_popular_products(limit)
+    else:
+        return engine.get_hybrid_recommendations(user, limit)
+
 def get_recommendations(user: User, algorithm: str = 'hybrid', limit: int = 10) -> List[Product]:
     try:
-        if algorithm == 'collaborative':
-            recommendations = recommendation_engine.get_collaborative_recommendations(user, limit)
-        elif algorithm == 'content':
-            recommendations = recommendation_engine.get_content_based_recommendations(user, limit)
-        elif algorithm == 'popular':
-            recommendations = recommendation_engine.get_popular_products(limit)
-        else:
-            recommendations = recommendation_engine.get_hybrid_recommendations(user, limit)
+        recommendations = []
+        if algorithm != 'popular':
+            recommendations = get_precomputed_recommendations(user, algorithm, limit)
         
-        if recommendations:
-            history = RecommendationHistory.objects.create(
-                user=user,
-                algorithm_used=algorithm
-            )
-            history.recommended_products.set(recommendations)
+        if not recommendations:
+            recommendations = get_live_recommendations(user, algorithm, limit)
         
+        log_recommendations(user, algorithm, recommendations)
         return recommendations
         
     except Exception as e:
         return recommendation_engine.get_popular_products(limit)
 
-def retrain_models():
-    recommendation_engine.train_models()
+def get_batch_recommendations(user_ids, algorithm: str = 'hybrid', limit: int = 10, chunk_size: int = 1024):
+    return get_engine().recommend_batch(user_ids, algorithm, limit, chunk_size)
+
+def update_models() -> int:
+    engine = get_engine()
+    updated, users_updated = engine.fold_in_new_interactions()
+    publish_engine(updated, expected=engine)
+    return users_updated
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from shop.models import Product
+import uuid
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -23,3 +24,62 @@ class RecommendationHistory(models.Model):
 
     def __str__(self):
         return f"Recommendations for {self.user.username} at {self.created_at}"
+
+class PrecomputedRecommendation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='precomputed_recommendations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='precomputed_recommendations')
+    algorithm = models.CharField(max_length=50)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('user', 'algorithm', 'rank')
+        ordering = ['user', 'algorithm', 'rank']
+
+    def __str__(self):
+        return f"#{self.rank} {self.algorithm} for {self.user.username}"
+
+class TrainingJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='training_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    artifact_version = models.CharField(max_length=50, blank=True)
+    error = models.TextField(blank=True)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Training job {self.id} ({self.status})"
+
+class UserProductScore(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_scores')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='user_scores')
+    score = models.FloatField(default=0.0)
+    content_interactions = models.IntegerField(default=0)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'product')
+
+    def __str__(self):
+        return f"{self.user.username} -> {self.product.name}: {self.score:.2f}"
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} up to {self.timestamp}"
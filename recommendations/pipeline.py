@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from . import artifacts
+from .similarity import top_k_similarities
+
+COLLABORATIVE_STATE = (
+    'user_item_matrix', 'positive_matrix', 'content_matrix', 'user_ids', 'user_order', 'product_ids',
+    'item_components', 'user_factors', 'user_index', 'interactions_until',
+)
+
+shared_tfidf = None
+
+
+def setup_training_process():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_project.settings')
+    import django
+    django.setup()
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def training_workers() -> int:
+    return settings.RECOMMENDATION_TRAINING_WORKERS or os.cpu_count() or 1
+
+
+def train_collaborative(collaborative_trainer: str) -> dict:
+    from .ml_engine import RecommendationEngine
+
+    engine = RecommendationEngine(collaborative_trainer)
+    try:
+        engine.train_collaborative_filtering()
+    finally:
+        connection.close()
+    return {name: getattr(engine, name) for name in COLLABORATIVE_STATE}
+
+
+def content_neighbours(path: str, shape, rows: np.ndarray, k: int, num_threads: int):
+    global shared_tfidf
+
+    if shared_tfidf is None or shared_tfidf[0] != path:
+        shared_tfidf = (path, artifacts.read_csr(path, 'tfidf_matrix', shape))
+    return top_k_similarities(shared_tfidf[1], k, rows, num_threads)
+
+
+def category_blocks(categories: np.ndarray, block_size: int):
+    labels, codes = np.unique(categories, return_inverse=True)
+    blocks = []
+    for code, label in enumerate(labels):
+        rows = np.flatnonzero(codes == code).astype(np.int32)
+        for start in range(0, len(rows), block_size):
+            blocks.append((str(label), rows[start:start + block_size]))
+    return blocks
+
+
+def train_stages(engine, workers: int) -> dict:
+    timings = {}
+    if workers <= 1:
+        _, timings['collaborative'] = timed(engine.train_collaborative_filtering)
+        _, timings['content'] = timed(engine.prepare_content_features)
+        return timings
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=setup_training_process
+    )
+    with tempfile.TemporaryDirectory(prefix='training-') as shared, pool:
+        collaborative = pool.submit(timed, train_collaborative, engine.collaborative_trainer)
+        categories, timings['content_features'] = timed(engine.prepare_content_features, False)
+
+        if categories is not None:
+            started = time.perf_counter()
+            k = max(min(settings.RECOMMENDATION_CONTENT_NEIGHBOURS, len(categories) - 1), 0)
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            artifacts.write_csr(shared, 'tfidf_matrix', engine.tfidf_matrix)
+            shape = engine.tfidf_matrix.shape
+            blocks = [
+                (label, rows, pool.submit(timed, content_neighbours, shared, shape, rows, k, threads))
+                for label, rows in category_blocks(categories, settings.RECOMMENDATION_CONTENT_BLOCK_SIZE)
+            ]
+
+            neighbours = np.zeros((len(categories), k), dtype=np.int32)
+            scores = np.zeros((len(categories), k), dtype=np.float32)
+            for label, rows, future in blocks:
+                (neighbours[rows], scores[rows]), seconds = future.result()
+                timings[f'content_block:{label}'] = timings.get(f'content_block:{label}', 0.0) + seconds
+
+            engine.content_neighbours, engine.content_scores = neighbours, scores
+            timings['content_neighbours'] = time.perf_counter() - started
+
+        state, timings['collaborative'] = collaborative.result()
+        for name, value in state.items():
+            setattr(engine, name, value)
+
+    return timings
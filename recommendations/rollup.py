@@ -0,0 +1,167 @@
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from shop.models import UserInteraction
+from .ml_engine import content_interactions, interaction_decay, interaction_weights
+from .models import RollupWatermark, UserProductScore
+
+SCORE_ROLLUP = 'user_product_score'
+
+
+def decay_between(later: pd.Series, earlier: pd.Series) -> np.ndarray:
+    half_life_days = settings.RECOMMENDATION_SCORE_HALF_LIFE_DAYS
+    if not half_life_days:
+        return np.ones(len(later))
+
+    ages = (later - earlier).dt.total_seconds().to_numpy()
+    return np.exp2(-np.maximum(ages, 0) / (half_life_days * 86400))
+
+
+def merge_scores(batch: pd.DataFrame, sign: int) -> int:
+    existing = pd.DataFrame(
+        list(
+            UserProductScore.objects.filter(user_id__in=batch['user_id'].unique().tolist())
+            .values_list('user_id', 'product_id', 'score', 'content_interactions', 'last_seen')
+        ),
+        columns=['user_id', 'product_id', 'old_score', 'old_content', 'old_last_seen']
+    )
+    existing['product_id'] = existing['product_id'].astype(str)
+    existing['old_last_seen'] = pd.to_datetime(existing['old_last_seen'], utc=True)
+
+    merged = batch.merge(existing, on=['user_id', 'product_id'], how='left')
+    has_old = merged['old_last_seen'].notna()
+    if sign < 0:
+        merged, has_old = merged[has_old], has_old[has_old]
+    if merged.empty:
+        return 0
+
+    old_last_seen = merged['old_last_seen'].fillna(merged['last_seen'])
+    last_seen = merged['last_seen'].where(merged['last_seen'] >= old_last_seen, old_last_seen)
+    score = merged['score'].to_numpy() * decay_between(last_seen, merged['last_seen'])
+    score += np.where(has_old, merged['old_score'].fillna(0).to_numpy() * decay_between(last_seen, old_last_seen), 0)
+    content = merged['content'].to_numpy() + merged['old_content'].fillna(0).to_numpy()
+
+    UserProductScore.objects.bulk_create(
+        [
+            UserProductScore(
+                user_id=int(user_id),
+                product_id=product_id,
+                score=float(row_score),
+                content_interactions=max(int(row_content), 0),
+                last_seen=row_last_seen.to_pydatetime()
+            )
+            for user_id, product_id, row_score, row_content, row_last_seen in zip(
+                merged['user_id'], merged['product_id'], score, content, last_seen
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'product'],
+        update_fields=['score', 'content_interactions', 'last_seen'],
+        batch_size=1000
+    )
+    if sign < 0:
+        UserProductScore.objects.filter(
+            user_id__in=merged['user_id'].unique().tolist(), content_interactions=0, score__range=(-1e-9, 1e-9)
+        ).delete()
+    return len(merged)
+
+
+def apply_interactions(interactions, sign: int = 1, users_per_batch: int = 500) -> int:
+    if not interactions:
+        return 0
+
+    frame = pd.DataFrame(interactions, columns=['user_id', 'product_id', 'interaction_type', 'timestamp'])
+    frame['product_id'] = frame['product_id'].astype(str)
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+    frame['content'] = content_interactions(frame['interaction_type']).astype(np.int64) * sign
+
+    last_seen = frame.groupby(['user_id', 'product_id'])['timestamp'].transform('max')
+    frame['score'] = interaction_weights(frame['interaction_type']) * decay_between(last_seen, frame['timestamp']) * sign
+
+    batch = frame.groupby(['user_id', 'product_id'], as_index=False).agg(
+        score=('score', 'sum'),
+        content=('content', 'sum'),
+        last_seen=('timestamp', 'max')
+    )
+
+    user_ids = batch['user_id'].unique()
+    updated = 0
+    for start in range(0, len(user_ids), users_per_batch):
+        users = user_ids[start:start + users_per_batch]
+        updated += merge_scores(batch[batch['user_id'].isin(users)], sign)
+    return updated
+
+
+def rollup_watermark():
+    return RollupWatermark.objects.filter(name=SCORE_ROLLUP).values_list('timestamp', flat=True).first()
+
+
+def update_score_rollup(until=None, batch_size: int = 100000) -> int:
+    until = until or timezone.now() - timedelta(seconds=settings.RECOMMENDATION_ROLLUP_LAG)
+
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.get_or_create(name=SCORE_ROLLUP)
+        since = watermark.timestamp
+        if since is not None and since >= until:
+            return 0
+        if not RollupWatermark.objects.filter(pk=watermark.pk, timestamp=since).update(timestamp=until):
+            return 0
+
+        interactions = UserInteraction.objects.filter(timestamp__lte=until)
+        if since is not None:
+            interactions = interactions.filter(timestamp__gt=since)
+        rows = interactions.order_by().values_list(
+            'user_id', 'product_id', 'interaction_type', 'timestamp'
+        ).iterator(chunk_size=batch_size)
+
+        applied = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return applied
+            apply_interactions(batch)
+            applied += len(batch)
+
+
+def retract_interactions(interactions) -> int:
+    watermark = RollupWatermark.objects.select_for_update().filter(name=SCORE_ROLLUP).values_list(
+        'timestamp', flat=True
+    ).first()
+    if watermark is None:
+        return 0
+    return apply_interactions([row for row in interactions if row[3] <= watermark], sign=-1)
+
+
+def delete_interactions(interactions) -> int:
+    with transaction.atomic():
+        retract_interactions(list(interactions.values_list('user_id', 'product_id', 'interaction_type', 'timestamp')))
+        deleted, _ = interactions.delete()
+    return deleted
+
+
+def rebuild_score_rollup() -> int:
+    with transaction.atomic():
+        UserProductScore.objects.all().delete()
+        RollupWatermark.objects.filter(name=SCORE_ROLLUP).update(timestamp=None)
+    return update_score_rollup()
+
+
+def load_score_rollup():
+    update_score_rollup()
+    interactions_until = rollup_watermark()
+
+    rows = list(
+        UserProductScore.objects.values_list('user_id', 'product_id', 'score', 'content_interactions', 'last_seen')
+    )
+    if not rows:
+        return None
+
+    user_col, product_col, scores, content_counts, last_seen = zip(*rows)
+    scores = np.asarray(scores, dtype=np.float32) * interaction_decay(last_seen, timezone.now())
+    return user_col, product_col, scores, np.asarray(content_counts, dtype=np.float32), interactions_until
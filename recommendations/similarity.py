@@ -0,0 +1,98 @@
+import numpy as np
+import scipy.sparse as sp
+
+try:
+    from . import fast_similarity
+except ImportError:
+    fast_similarity = None
+
+
+def inverse_row_norms(X: sp.csr_matrix) -> np.ndarray:
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1), dtype=np.float64).ravel())
+    return np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+
+def normalized_csr(X) -> sp.csr_matrix:
+    X = sp.csr_matrix(X, dtype=np.float64)
+    X.sum_duplicates()
+    return (sp.diags(inverse_row_norms(X)) @ X).tocsr()
+
+
+def cosine_similarity_python(X, Y=None) -> np.ndarray:
+    X = normalized_csr(X)
+    Y = X if Y is None else normalized_csr(Y)
+    return (X @ Y.T).toarray()
+
+
+def top_k_similarities_python(X, k: int, rows=None, block_size: int = 256):
+    X = normalized_csr(X)
+    n_items = X.shape[0]
+    rows = np.arange(n_items) if rows is None else np.asarray(rows, dtype=np.int64)
+    k = min(k, n_items - 1)
+    top_indices = np.zeros((len(rows), max(k, 0)), dtype=np.int32)
+    top_values = np.zeros((len(rows), max(k, 0)), dtype=np.float32)
+    if k <= 0 or not len(rows):
+        return top_indices, top_values
+
+    X_t = X.T.tocsc()
+    for start in range(0, len(rows), block_size):
+        stop = min(start + block_size, len(rows))
+        block = (X[rows[start:stop]] @ X_t).toarray()
+        block[np.arange(stop - start), rows[start:stop]] = -np.inf
+        thresholds = np.partition(block, n_items - k, axis=1)[:, n_items - k]
+
+        for i, (row, threshold) in enumerate(zip(block, thresholds)):
+            above = np.flatnonzero(row > threshold)
+            tied = np.flatnonzero(row == threshold)[:k - len(above)]
+            chosen = np.concatenate([above, tied])
+            chosen = chosen[np.lexsort((chosen, -row[chosen]))]
+            top_indices[start + i] = chosen
+            top_values[start + i] = row[chosen]
+
+    return top_indices, top_values
+
+
+def cosine_similarity(X, Y=None) -> np.ndarray:
+    if fast_similarity is not None:
+        return fast_similarity.cosine_similarity_optimized(X, Y)
+    return cosine_similarity_python(X, Y)
+
+
+def top_k_similarities(X, k: int, rows=None, num_threads: int = 0):
+    if fast_similarity is not None:
+        return fast_similarity.top_k_similarities(X, k, rows, num_threads)
+    return top_k_similarities_python(X, k, rows)
+
+
+def check_kernels(n_items: int = 500, n_features: int = 200, density: float = 0.05, k: int = 20,
+                  seed: int = 0, tolerance: float = 1e-6) -> dict:
+    if fast_similarity is None:
+        raise ImportError('fast_similarity is not built; run `python setup.py build_ext --inplace`')
+
+    X = sp.random(n_items, n_features, density=density, format='csr', random_state=seed)
+    Y = sp.random(n_items // 2, n_features, density=density, format='csr', random_state=seed + 1)
+
+    cosine_error = max(
+        np.abs(fast_similarity.cosine_similarity_optimized(X) - cosine_similarity_python(X)).max(),
+        np.abs(fast_similarity.cosine_similarity_optimized(X, Y) - cosine_similarity_python(X, Y)).max()
+    )
+
+    compiled_indices, compiled_values = fast_similarity.top_k_similarities(X, k)
+    python_indices, python_values = top_k_similarities_python(X, k)
+    subset = np.random.default_rng(seed).permutation(n_items)[:n_items // 3]
+    compiled_subset = fast_similarity.top_k_similarities(X, k, subset)
+    python_subset = top_k_similarities_python(X, k, subset)
+    compiled_indices = np.vstack([compiled_indices, compiled_subset[0]])
+    compiled_values = np.vstack([compiled_values, compiled_subset[1]])
+    python_indices = np.vstack([python_indices, python_subset[0]])
+    python_values = np.vstack([python_values, python_subset[1]])
+
+    top_k_error = np.abs(compiled_values - python_values).max()
+    mismatched = (compiled_indices != python_indices) & ~np.isclose(compiled_values, python_values, atol=tolerance)
+
+    return {
+        'cosine_max_error': float(cosine_error),
+        'top_k_max_error': float(top_k_error),
+        'top_k_mismatched_neighbours': int(mismatched.sum()),
+        'agree': bool(cosine_error <= tolerance and top_k_error <= tolerance and not mismatched.any()),
+    }
@@ -6,7 +6,10 @@ app_name = 'recommendations'
 urlpatterns = [
     path('recommendations/', views.get_user_recommendations, name='get_recommendations'),
     path('retrain/', views.retrain_recommendation_models, name='retrain_models'),
+    path('retrain/<uuid:job_id>/', views.retrain_job_status, name='retrain_status'),
+    path('update/', views.update_recommendation_models, name='update_models'),
     path('stats/', views.recommendation_stats, name='stats'),
     path('history/', views.user_recommendation_history, name='history'),
     path('similar/<uuid:product_id>/', views.similar_products, name='similar_products'),
+    path('search/', views.product_search, name='product_search'),
 ]
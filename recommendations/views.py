@@ -1,11 +1,32 @@
+from django.conf import settings
 from django.http import JsonResponse
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .ml_engine import get_recommendations, retrain_models, recommendation_engine
+from .ml_engine import get_recommendations, update_models, get_engine
+from .jobs import start_retraining
+from .history import history_writer
+from .models import TrainingJob
 from shop.models import Product
+from shop.catalog_cache import get_products_by_id, get_related_products
+from shop.search import SEARCH_MODES, search_products
+from shop.ingestion import interaction_writer
+
+def product_data(product):
+    return {
+        'id': str(product.id),
+        'name': product.name,
+        'slug': product.slug,
+        'price': str(product.price),
+        'description': product.description[:100] + '...' if len(product.description) > 100 else product.description,
+        'category': product.category.name,
+        'rating': product.rating,
+        'image_url': product.image.url if product.image else None,
+        'url': product.get_absolute_url(),
+    }
 
 @login_required
 @api_view(['GET'])
@@ -15,19 +36,7 @@ def get_user_recommendations(request):
     
     recommendations = get_recommendations(request.user, algorithm, limit)
     
-    products_data = []
-    for product in recommendations:
-        products_data.append({
-            'id': str(product.id),
-            'name': product.name,
-            'slug': product.slug,
-            'price': str(product.price),
-            'description': product.description[:100] + '...' if len(product.description) > 100 else product.description,
-            'category': product.category.name,
-            'rating': product.rating,
-            'image_url': product.image.url if product.image else None,
-            'url': product.get_absolute_url(),
-        })
+    products_data = [product_data(product) for product in recommendations]
     
     return Response({
         'recommendations': products_data,
@@ -42,8 +51,45 @@ def retrain_recommendation_models(request):
         return Response({'error': 'Admin access required'}, status=403)
     
     try:
-        retrain_models()
-        return Response({'message': 'Models retrained successfully'})
+        job = start_retraining(requested_by=request.user)
+        return Response(training_job_data(job), status=202)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+def retrain_job_status(request, job_id):
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=403)
+    
+    try:
+        job = TrainingJob.objects.get(id=job_id)
+    except TrainingJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=404)
+    
+    return Response(training_job_data(job))
+
+def training_job_data(job):
+    return {
+        'job_id': str(job.id),
+        'status': job.status,
+        'artifact_version': job.artifact_version or None,
+        'error': job.error or None,
+        'stage_timings': job.stage_timings,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('recommendations:retrain_status', args=[job.id]),
+    }
+
+@api_view(['POST'])
+@csrf_exempt
+def update_recommendation_models(request):
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=403)
+    
+    try:
+        users_updated = update_models()
+        return Response({'message': 'Models updated successfully', 'users_updated': users_updated})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -65,6 +111,8 @@ def recommendation_stats(request):
         interaction_breakdown[interaction_type] = count
     
     stats['interaction_breakdown'] = interaction_breakdown
+    stats['history_buffer'] = history_writer.snapshot()
+    stats['interaction_ingest'] = interaction_writer.snapshot()
     
     return Response(stats)
 
@@ -96,45 +144,18 @@ def user_recommendation_history(request):
 
 @api_view(['GET'])
 def similar_products(request, product_id):
-    try:
-        product = Product.objects.get(id=product_id, available=True)
-    except Product.DoesNotExist:
+    products = get_products_by_id([product_id])
+    if not products:
         return Response({'error': 'Product not found'}, status=404)
+    product = products[0]
     
-    if recommendation_engine.product_features is not None:
-        product_id_str = str(product.id)
-        if product_id_str in recommendation_engine.product_features.index:
-            similar_scores = recommendation_engine.product_features.loc[product_id_str].sort_values(ascending=False)
-            similar_product_ids = similar_scores.index[1:11]
-            
-            similar_products = Product.objects.filter(
-                id__in=[pid for pid in similar_product_ids],
-                available=True
-            )[:5]
-        else:
-            similar_products = Product.objects.filter(
-                category=product.category,
-                available=True
-            ).exclude(id=product.id)[:5]
+    similar_product_ids = get_engine().get_similar_product_ids(product.id, 10)
+    if similar_product_ids:
+        similar_products = get_products_by_id(similar_product_ids)[:5]
     else:
-        similar_products = Product.objects.filter(
-            category=product.category,
-            available=True
-        ).exclude(id=product.id)[:5]
-    
-    products_data = []
-    for p in similar_products:
-        products_data.append({
-            'id': str(p.id),
-            'name': p.name,
-            'slug': p.slug,
-            'price': str(p.price),
-            'description': p.description[:100] + '...' if len(p.description) > 100 else p.description,
-            'category': p.category.name,
-            'rating': p.rating,
-            'image_url': p.image.url if p.image else None,
-            'url': p.get_absolute_url(),
-        })
+        similar_products = get_related_products(product, 5)
+    
+    products_data = [product_data(p) for p in similar_products]
     
     return Response({
         'similar_products': products_data,
@@ -144,3 +165,27 @@ def similar_products(request, product_id):
             'category': product.category.name
         }
     })
+
+@api_view(['GET'])
+def product_search(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query parameter q is required'}, status=400)
+    
+    mode = request.GET.get('mode')
+    mode = mode if mode in SEARCH_MODES else settings.SEARCH_MODE
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), settings.SEARCH_MAX_RESULTS)
+    except ValueError:
+        return Response({'error': 'Invalid limit'}, status=400)
+    
+    products = Product.objects.filter(available=True).select_related('category')
+    results = search_products(products, query, mode)[:limit]
+    
+    products_data = [product_data(product) for product in results]
+    return Response({
+        'query': query,
+        'mode': mode,
+        'results': products_data,
+        'count': len(products_data)
+    })
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+from Cython.Build import cythonize
+from setuptools import Extension, setup
+
+if sys.platform == 'win32':
+    openmp_compile_args, openmp_link_args = ['/openmp'], []
+elif sys.platform == 'darwin' or os.environ.get('DISABLE_OPENMP'):
+    openmp_compile_args, openmp_link_args = [], []
+else:
+    openmp_compile_args, openmp_link_args = ['-fopenmp'], ['-fopenmp']
+
+optimize_args = ['/O2'] if sys.platform == 'win32' else ['-O3']
+
+extensions = [
+    Extension(
+        f'recommendations.{name}',
+        [f'recommendations/{name}.pyx'],
+        include_dirs=[np.get_include()],
+        define_macros=[('NPY_NO_DEPRECATED_API', 'NPY_1_7_API_VERSION')],
+        extra_compile_args=optimize_args + openmp_compile_args,
+        extra_link_args=openmp_link_args,
+    )
+    for name in ('fast_similarity', 'matrix_operations')
+]
+
+setup(
+    name='ecom-platform-kernels',
+    ext_modules=cythonize(extensions, compiler_directives={'language_level': 3}),
+    zip_safe=False,
+)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Product, Cart, CartItem, Order, OrderItem, UserInteraction
+from .models import Category, Product, Cart, CartItem, Order, OrderItem, UserInteraction, StockReservation, StockShard
+from recommendations.rollup import delete_interactions
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -30,6 +31,10 @@ class CartAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     inlines = [CartItemInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_totals()
+
     def get_total_price_inr(self, obj):
         return f"₹{obj.get_total_price()}"
     get_total_price_inr.short_description = "Total Price (INR)"
@@ -51,8 +56,25 @@ class OrderAdmin(admin.ModelAdmin):
         return f"₹{obj.total_amount}"
     total_amount_inr.short_description = "Total Amount (INR)"
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['product', 'cart', 'quantity', 'expires_at']
+    list_filter = ['expires_at']
+    readonly_fields = ['created_at']
+
+@admin.register(StockShard)
+class StockShardAdmin(admin.ModelAdmin):
+    list_display = ['product', 'shard', 'stock']
+    readonly_fields = ['product', 'shard', 'stock']
+
 @admin.register(UserInteraction)
 class UserInteractionAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'interaction_type', 'timestamp']
     list_filter = ['interaction_type', 'timestamp']
     readonly_fields = ['timestamp']
+
+    def delete_model(self, request, obj):
+        delete_interactions(UserInteraction.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_interactions(queryset)
@@ -0,0 +1,109 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Category, Product
+
+VERSION_KEY = 'catalog:version'
+
+
+def local_cache():
+    return caches['catalog']
+
+
+def shared_cache():
+    return caches['catalog_shared'] if 'catalog_shared' in settings.CACHES else None
+
+
+def version_cache():
+    return shared_cache() or local_cache()
+
+
+def catalog_version() -> int:
+    store = version_cache()
+    version = store.get(VERSION_KEY)
+    if version is None:
+        store.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = store.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    store = version_cache()
+    try:
+        store.incr(VERSION_KEY)
+    except ValueError:
+        store.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def versioned_keys(names, version: int) -> dict:
+    return {f'catalog:{version}:{hashlib.md5(name.encode()).hexdigest()}': name for name in names}
+
+
+def cached_many(names, builder) -> dict:
+    keys = versioned_keys(names, catalog_version())
+    found = local_cache().get_many(keys)
+
+    shared = shared_cache()
+    if shared is not None and len(found) < len(keys):
+        remote = shared.get_many([key for key in keys if key not in found])
+        if remote:
+            local_cache().set_many(remote)
+            found.update(remote)
+
+    missing = [name for key, name in keys.items() if key not in found]
+    if missing:
+        built = builder(missing)
+        fresh = {key: (built.get(name),) for key, name in keys.items() if name in missing}
+        local_cache().set_many(fresh)
+        if shared is not None:
+            shared.set_many(fresh)
+        found.update(fresh)
+
+    return {name: found[key][0] for key, name in keys.items()}
+
+
+def cached(name: str, builder):
+    return cached_many([name], lambda names: {name: builder()})[name]
+
+
+def get_categories():
+    return cached('categories', lambda: list(Category.objects.all()))
+
+
+def get_category(slug: str):
+    return cached(f'category:{slug}', lambda: Category.objects.filter(slug=slug).first())
+
+
+def get_product(slug: str):
+    return cached(
+        f'product:{slug}',
+        lambda: Product.objects.select_related('category').filter(slug=slug, available=True).first()
+    )
+
+
+def get_products_by_id(product_ids) -> list:
+    names = [f'product-id:{uuid.UUID(str(product_id))}' for product_id in product_ids]
+
+    def build(missing):
+        products = Product.objects.select_related('category').filter(available=True).in_bulk(
+            [name.split(':', 1)[1] for name in missing]
+        )
+        return {f'product-id:{product_id}': product for product_id, product in products.items()}
+
+    found = cached_many(names, build)
+    return [found[name] for name in names if found[name] is not None]
+
+
+def get_related_products(product, limit: int = 4) -> list:
+    return cached(
+        f'related:{product.id}:{limit}',
+        lambda: list(
+            Product.objects.select_related('category').filter(
+                category_id=product.category_id, available=True
+            ).exclude(id=product.id)[:limit]
+        )
+    )
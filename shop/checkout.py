@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .ingestion import record_interactions
+from .inventory import claim_reservations
+from .models import Cart, Order, OrderItem
+
+
+def place_order(cart: Cart, user, shipping_address: str, phone_number: str, email: str,
+                session_key: str = None) -> Order:
+    with transaction.atomic():
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+        cart_items = list(
+            cart.items.select_related('product').only('cart', 'quantity', 'product__name', 'product__price', 'product__stock_shards')
+        )
+        if not cart_items:
+            return None
+        claim_reservations(cart, cart_items)
+
+        order = Order.objects.create(
+            user=user,
+            total_amount=sum(item.quantity * item.product.price for item in cart_items),
+            shipping_address=shipping_address,
+            phone_number=phone_number,
+            email=email,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=item.product.id, quantity=item.quantity, price=item.product.price)
+            for item in cart_items
+        ])
+
+        cart.items.all().delete()
+        Cart.objects.filter(pk=cart.pk).update(total_items=0, total_price=0, updated_at=timezone.now())
+
+        products = [item.product for item in cart_items]
+        transaction.on_commit(lambda: record_interactions(user, products, 'purchase', session_key))
+
+    cart.total_items, cart.total_price = 0, 0
+    return order
@@ -0,0 +1,91 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from recommendations.buffering import BufferedWriter, SpoolQueue
+from recommendations.rollup import delete_interactions, update_score_rollup
+from .models import Product, UserInteraction
+
+FEEDBACK_TYPES = ('like', 'dislike')
+
+logger = logging.getLogger(__name__)
+
+
+def write_interactions(events):
+    user_ids = {event[0] for event in events}
+    product_ids = {event[1] for event in events}
+    user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    product_ids = {str(product_id) for product_id in Product.objects.filter(id__in=product_ids).values_list('id', flat=True)}
+
+    rows = []
+    feedback = {}
+    for user_id, product_id, interaction_type, session_key, replace_feedback in events:
+        if user_id not in user_ids or product_id not in product_ids:
+            continue
+        if replace_feedback:
+            feedback[(user_id, product_id)] = (interaction_type, session_key)
+            continue
+        rows.append(UserInteraction(
+            user_id=user_id,
+            product_id=product_id,
+            interaction_type=interaction_type,
+            session_key=session_key
+        ))
+
+    with transaction.atomic():
+        pairs = list(feedback)
+        for start in range(0, len(pairs), 200):
+            condition = Q()
+            for user_id, product_id in pairs[start:start + 200]:
+                condition |= Q(user_id=user_id, product_id=product_id)
+            delete_interactions(UserInteraction.objects.filter(condition, interaction_type__in=FEEDBACK_TYPES))
+
+        rows.extend(
+            UserInteraction(user_id=user_id, product_id=product_id, interaction_type=interaction_type, session_key=session_key)
+            for (user_id, product_id), (interaction_type, session_key) in feedback.items()
+        )
+        UserInteraction.objects.bulk_create(rows, batch_size=500)
+
+    if settings.RECOMMENDATION_USE_ROLLUP:
+        try:
+            update_score_rollup()
+        except Exception:
+            logger.exception('Score rollup update failed; the next flush will catch up')
+
+
+def build_writer() -> BufferedWriter:
+    queue = None
+    if settings.INTERACTION_INGEST_MODE == 'spool':
+        queue = SpoolQueue(settings.INTERACTION_SPOOL_DIR, 'interactions')
+
+    return BufferedWriter(
+        write_interactions,
+        max_size=settings.INTERACTION_INGEST_BATCH_SIZE,
+        flush_interval=settings.INTERACTION_INGEST_FLUSH_INTERVAL,
+        max_pending=settings.INTERACTION_INGEST_MAX_PENDING,
+        queue=queue,
+        name='interaction-ingest'
+    )
+
+
+interaction_writer = build_writer()
+
+
+def record_interactions(user: User, products, interaction_type: str, session_key: str = None):
+    replace_feedback = interaction_type in FEEDBACK_TYPES
+    events = [
+        (user.id, str(product.id), interaction_type, session_key, replace_feedback)
+        for product in products
+    ]
+
+    if settings.INTERACTION_INGEST_MODE == 'sync':
+        write_interactions(events)
+    else:
+        interaction_writer.extend(events)
+
+
+def record_interaction(user: User, product: Product, interaction_type: str, session_key: str = None):
+    record_interactions(user, [product], interaction_type, session_key)
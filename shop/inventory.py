@@ -0,0 +1,185 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockReservation, StockShard
+
+
+class OutOfStock(Exception):
+
+    def __init__(self, product):
+        super().__init__(f'Not enough stock left for {product.name}')
+        self.product = product
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(seconds=settings.INVENTORY_RESERVATION_SECONDS)
+
+
+def current_shards(product) -> int:
+    product.stock_shards = Product.objects.values_list('stock_shards', flat=True).get(pk=product.pk)
+    return product.stock_shards
+
+
+def take_sharded_stock(product, quantity: int) -> bool:
+    start = random.randrange(product.stock_shards)
+    for offset in range(product.stock_shards):
+        shard = (start + offset) % product.stock_shards
+        taken = StockShard.objects.filter(product_id=product.pk, shard=shard, stock__gte=quantity).update(
+            stock=F('stock') - quantity
+        )
+        if taken:
+            return True
+
+    with transaction.atomic():
+        shards = list(StockShard.objects.select_for_update().filter(product_id=product.pk, stock__gt=0).order_by('shard'))
+        if sum(shard.stock for shard in shards) < quantity:
+            return False
+        for shard in shards:
+            taken = min(shard.stock, quantity)
+            StockShard.objects.filter(pk=shard.pk).update(stock=F('stock') - taken)
+            quantity -= taken
+            if not quantity:
+                break
+    return True
+
+
+def take_stock(product, quantity: int) -> bool:
+    if quantity <= 0:
+        return True
+
+    shards = product.stock_shards
+    if not shards:
+        taken = Product.objects.filter(pk=product.pk, stock_shards=0, stock__gte=quantity).update(
+            stock=F('stock') - quantity
+        )
+        if taken:
+            return True
+    elif take_sharded_stock(product, quantity):
+        return True
+
+    if current_shards(product) == shards:
+        return False
+    return take_stock(product, quantity)
+
+
+def return_stock(product, quantity: int):
+    if quantity <= 0:
+        return
+
+    shards = product.stock_shards
+    if shards:
+        returned = StockShard.objects.filter(product_id=product.pk, shard=random.randrange(shards)).update(
+            stock=F('stock') + quantity
+        )
+    else:
+        returned = Product.objects.filter(pk=product.pk, stock_shards=0).update(stock=F('stock') + quantity)
+
+    if not returned and current_shards(product) != shards:
+        return_stock(product, quantity)
+
+
+def available_stock(product) -> int:
+    if not current_shards(product):
+        return Product.objects.values_list('stock', flat=True).get(pk=product.pk)
+    return StockShard.objects.filter(product_id=product.pk).aggregate(total=Sum('stock'))['total'] or 0
+
+
+def reserve_stock(cart, product, quantity: int):
+    if quantity <= 0:
+        return
+
+    with transaction.atomic():
+        if not take_stock(product, quantity):
+            if not release_expired_reservations(product) or not take_stock(product, quantity):
+                raise OutOfStock(product)
+
+        expires_at = reservation_expiry()
+        held = StockReservation.objects.filter(cart=cart, product_id=product.pk).update(
+            quantity=F('quantity') + quantity, expires_at=expires_at
+        )
+        if not held:
+            StockReservation.objects.create(cart=cart, product_id=product.pk, quantity=quantity, expires_at=expires_at)
+
+
+def release_stock(cart, product, quantity: int = None) -> int:
+    if quantity is not None and quantity <= 0:
+        return 0
+
+    reservation = StockReservation.objects.filter(cart=cart, product_id=product.pk).first()
+    if reservation is None:
+        return 0
+
+    releasing = reservation.quantity if quantity is None else min(quantity, reservation.quantity)
+    with transaction.atomic():
+        held = StockReservation.objects.filter(pk=reservation.pk, quantity=reservation.quantity)
+        if releasing == reservation.quantity:
+            released, _ = held.delete()
+        else:
+            released = held.update(quantity=F('quantity') - releasing)
+        if released:
+            return_stock(product, releasing)
+
+    if not released:
+        return release_stock(cart, product, quantity)
+    return releasing
+
+
+def release_reservations(reservations) -> int:
+    released = 0
+    for reservation in reservations.select_related('product'):
+        with transaction.atomic():
+            deleted, _ = StockReservation.objects.filter(
+                pk=reservation.pk, quantity=reservation.quantity, expires_at=reservation.expires_at
+            ).delete()
+            if deleted:
+                return_stock(reservation.product, reservation.quantity)
+                released += 1
+    return released
+
+
+def release_expired_reservations(product=None, limit: int = None) -> int:
+    expired = StockReservation.objects.filter(expires_at__lte=timezone.now())
+    if product is not None:
+        expired = expired.filter(product_id=product.pk)
+    return release_reservations(expired.order_by('expires_at')[:limit or settings.INVENTORY_RELEASE_BATCH_SIZE])
+
+
+def claim_reservations(cart, cart_items):
+    held = dict(cart.reservations.select_for_update().values_list('product_id', 'quantity'))
+    cart.reservations.all().delete()
+
+    for item in cart_items:
+        reserved = held.get(item.product.pk, 0)
+        if reserved > item.quantity:
+            return_stock(item.product, reserved - item.quantity)
+        elif not take_stock(item.product, item.quantity - reserved):
+            raise OutOfStock(item.product)
+
+
+def set_stock_shards(product, shards: int):
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        existing = StockShard.objects.select_for_update().filter(product=product)
+        total = product.stock
+        if product.stock_shards:
+            total = sum(existing.values_list('stock', flat=True))
+        existing.delete()
+
+        base, extra = divmod(total, shards) if shards else (0, 0)
+        StockShard.objects.bulk_create([
+            StockShard(product=product, shard=shard, stock=base + (shard < extra))
+            for shard in range(shards)
+        ])
+        Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=shards)
+    return total
+
+
+def sync_sharded_stock() -> int:
+    totals = StockShard.objects.filter(product=OuterRef('pk')).values('product').annotate(total=Sum('stock')).values('total')
+    return Product.objects.filter(stock_shards__gt=0).update(stock=Coalesce(Subquery(totals), 0))
@@ -0,0 +1,65 @@
+import random
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.buffering import BufferedWriter, SpoolQueue
+from recommendations.rollup import delete_interactions
+from shop.ingestion import write_interactions
+from shop.models import Product, UserInteraction
+
+
+class Command(BaseCommand):
+    help = 'Measure interaction ingest throughput for the sync, memory and spool modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000, help='Number of events to ingest')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events written per bulk insert')
+        parser.add_argument('--modes', default='sync,memory,spool', help='Comma-separated modes to measure')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated interactions')
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.values_list('id', flat=True))
+        product_ids = [str(product_id) for product_id in Product.objects.values_list('id', flat=True)]
+        if not user_ids or not product_ids:
+            raise CommandError('Need at least one user and one product')
+
+        session_key = 'benchmark-ingest'
+        events = [
+            (random.choice(user_ids), random.choice(product_ids), 'view', session_key, False)
+            for _ in range(options['events'])
+        ]
+
+        for mode in options['modes'].split(','):
+            started = time.perf_counter()
+            if mode == 'sync':
+                for event in events:
+                    write_interactions([event])
+                accepted = time.perf_counter() - started
+            else:
+                queue = None
+                if mode == 'spool':
+                    queue = SpoolQueue(tempfile.mkdtemp(prefix='ingest-benchmark-'), 'interactions')
+                writer = BufferedWriter(
+                    write_interactions,
+                    max_size=options['batch_size'],
+                    flush_interval=0.5,
+                    max_pending=len(events),
+                    queue=queue,
+                    name=f'ingest-benchmark-{mode}'
+                )
+                for event in events:
+                    writer.add(event)
+                accepted = time.perf_counter() - started
+                writer.close()
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f'{mode}: accepted {len(events) / max(accepted, 1e-9):.0f} events/s, '
+                f'persisted {len(events) / max(elapsed, 1e-9):.0f} events/s'
+            )
+
+        if not options['keep']:
+            delete_interactions(UserInteraction.objects.filter(session_key=session_key))
@@ -1,8 +1,18 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from shop.models import Category, Product, UserInteraction
+from shop.catalog_cache import bump_catalog_version
+from shop.search import rebuild_search_index
 from recommendations.models import UserProfile
+from recommendations.benchmark.synthetic import deterministic_uuids, power_law_weights
+from datetime import timedelta
+import numpy as np
 import random
+import time
 from decimal import Decimal
 
 
@@ -12,6 +22,13 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--users', type=int, default=10, help='Number of users to create')
         parser.add_argument('--products', type=int, default=50, help='Number of products to create')
+        parser.add_argument('--bulk', action='store_true', help='Generate a large dataset with chunked bulk inserts')
+        parser.add_argument('--interactions', type=int, help='Interactions to create in bulk mode (defaults to 20 per user)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for bulk mode')
+        parser.add_argument('--skew', type=float, default=1.1, help='Power-law exponent for product and user activity')
+        parser.add_argument('--session-length', type=float, default=6.0, help='Mean interactions per browsing session')
+        parser.add_argument('--days', type=int, default=90, help='Spread bulk interactions over this many days')
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Rows per bulk insert transaction')
 
     def handle(self, *args, **options):
         self.stdout.write('Creating Indian e-commerce dummy data...')
@@ -109,6 +126,16 @@ class Command(BaseCommand):
             ],
         }
 
+        indian_names = [
+            ('Rahul', 'Sharma'), ('Priya', 'Patel'), ('Amit', 'Singh'), ('Sneha', 'Gupta'),
+            ('Vikram', 'Kumar'), ('Anita', 'Reddy'), ('Suresh', 'Joshi'), ('Kavya', 'Nair'),
+            ('Arjun', 'Agarwal'), ('Meera', 'Iyer'), ('Rohit', 'Verma'), ('Pooja', 'Yadav')
+        ]
+
+        if options['bulk']:
+            self.populate_bulk(options, categories, products_data, indian_names)
+            return
+
         # Create products with Indian pricing in rupees
         created_products = 0
         for category in categories:
@@ -136,12 +163,6 @@ class Command(BaseCommand):
         self.stdout.write(f'Created {created_products} Indian products')
 
         # Create test users with Indian names
-        indian_names = [
-            ('Rahul', 'Sharma'), ('Priya', 'Patel'), ('Amit', 'Singh'), ('Sneha', 'Gupta'),
-            ('Vikram', 'Kumar'), ('Anita', 'Reddy'), ('Suresh', 'Joshi'), ('Kavya', 'Nair'),
-            ('Arjun', 'Agarwal'), ('Meera', 'Iyer'), ('Rohit', 'Verma'), ('Pooja', 'Yadav')
-        ]
-        
         created_users = 0
         for i in range(min(options['users'], len(indian_names))):
             first_name, last_name = indian_names[i]
@@ -212,3 +233,186 @@ class Command(BaseCommand):
                 f'- {created_interactions} interactions'
             )
         )
+
+    def populate_bulk(self, options, categories, products_data, indian_names):
+        rng = np.random.default_rng(options['seed'])
+        chunk_size = max(1, options['chunk_size'])
+        n_users = options['users']
+        n_products = options['products']
+        n_interactions = options['interactions'] if options['interactions'] is not None else n_users * 20
+        if n_users < 1 or n_products < 1:
+            raise CommandError('Bulk mode needs at least one user and one product')
+
+        tag = f"s{options['seed']}"
+        if User.objects.filter(username__startswith=f'bulk_{tag}_').exists():
+            raise CommandError(f"Bulk data for seed {options['seed']} already exists, use a different --seed")
+
+        started = time.perf_counter()
+        categories = [category for category in categories if category.name in products_data]
+        templates = [(category, product) for category in categories for product in products_data[category.name]]
+        product_ids = deterministic_uuids(n_products, rng)
+        template_codes = rng.integers(0, len(templates), size=n_products)
+        product_category = np.asarray([categories.index(templates[code][0]) for code in template_codes])
+        product_weights = power_law_weights(n_products, options['skew'], rng)
+        price_factors = rng.uniform(0.8, 1.2, size=n_products)
+        ratings = np.round(rng.uniform(3.0, 5.0, size=n_products), 1)
+        stock = rng.integers(0, 500, size=n_products)
+
+        for start in range(0, n_products, chunk_size):
+            with transaction.atomic():
+                Product.objects.bulk_create([
+                    Product(
+                        id=product_ids[index],
+                        name=f'{templates[template_codes[index]][1][0]} #{index + 1}',
+                        slug=f'bulk-{tag}-product-{index + 1}',
+                        category=templates[template_codes[index]][0],
+                        description=templates[template_codes[index]][1][1],
+                        price=Decimal(str(round(templates[template_codes[index]][1][2] * price_factors[index], 2))),
+                        stock=int(stock[index]),
+                        rating=float(ratings[index]),
+                        popularity_score=round(float(product_weights[index] / product_weights.max()), 4),
+                        tags=templates[template_codes[index]][1][3],
+                    )
+                    for index in range(start, min(start + chunk_size, n_products))
+                ])
+        rebuild_search_index()
+        bump_catalog_version()
+        self.stdout.write(f'Created and indexed {n_products} products in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        password = make_password('indian123')
+        name_codes = rng.integers(0, len(indian_names), size=n_users)
+        price_ranges = np.asarray(['budget', 'mid-range', 'premium'])[rng.integers(0, 3, size=n_users)]
+        brand_preferences = np.asarray(['local', 'international', 'premium'])[rng.integers(0, 3, size=n_users)]
+        preferred_category = rng.integers(0, len(categories), size=n_users)
+        user_ids = np.zeros(n_users, dtype=np.int64)
+
+        for start in range(0, n_users, chunk_size):
+            stop = min(start + chunk_size, n_users)
+            usernames = []
+            users = []
+            for index in range(start, stop):
+                first_name, last_name = indian_names[name_codes[index]]
+                username = f'bulk_{tag}_{first_name.lower()}{last_name.lower()}{index + 1}'
+                usernames.append(username)
+                users.append(User(
+                    username=username,
+                    email=f'{username}@example.com',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password,
+                ))
+
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+                user_ids[start:stop] = [ids[username] for username in usernames]
+                UserProfile.objects.bulk_create([
+                    UserProfile(
+                        user_id=int(user_ids[index]),
+                        preferences={
+                            'preferred_categories': [categories[preferred_category[index]].slug],
+                            'price_range': str(price_ranges[index]),
+                            'brand_preference': str(brand_preferences[index]),
+                        }
+                    )
+                    for index in range(start, stop)
+                ])
+        self.stdout.write(f'Created {n_users} users with profiles in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        user_weights = power_law_weights(n_users, options['skew'] * 0.8, rng)
+        category_products = [np.flatnonzero(product_category == code) for code in range(len(categories))]
+        category_weights = [product_weights[items] / product_weights[items].sum() for items in category_products]
+        now = timezone.now()
+        created_interactions = 0
+        session_offset = 0
+
+        while created_interactions < n_interactions:
+            events = self.generate_sessions(
+                rng, min(chunk_size, n_interactions - created_interactions), options,
+                user_weights, preferred_category, category_products, category_weights
+            )
+            sessions, users, products, interaction_types, offsets = events
+            timestamps = [now - timedelta(seconds=float(offset)) for offset in offsets]
+            interactions = [
+                UserInteraction(
+                    user_id=int(user_ids[user]),
+                    product_id=product_ids[product],
+                    interaction_type=interaction_type,
+                    session_key=f'bulk-{tag}-{session_offset + session}',
+                )
+                for session, user, product, interaction_type in zip(sessions, users, products, interaction_types)
+            ]
+            with transaction.atomic():
+                UserInteraction.objects.bulk_create(interactions)
+                for interaction, timestamp in zip(interactions, timestamps):
+                    interaction.timestamp = timestamp
+                UserInteraction.objects.bulk_update(interactions, ['timestamp'])
+            session_offset += int(sessions.max()) + 1
+            created_interactions += len(users)
+        self.stdout.write(f'Created {created_interactions} interactions in {time.perf_counter() - started:.1f}s')
+
+        if settings.RECOMMENDATION_USE_ROLLUP:
+            from recommendations.rollup import rebuild_score_rollup
+
+            started = time.perf_counter()
+            rebuild_score_rollup()
+            self.stdout.write(f'Rebuilt the score rollup in {time.perf_counter() - started:.1f}s')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully populated bulk dataset (seed {options["seed"]}) with:\n'
+                f'- {n_products} products\n'
+                f'- {n_users} users\n'
+                f'- {created_interactions} interactions'
+            )
+        )
+
+    def generate_sessions(self, rng, n_events, options, user_weights, preferred_category,
+                          category_products, category_weights):
+        n_sessions = max(1, int(np.ceil(n_events / options['session_length'])))
+        lengths = rng.geometric(1.0 / max(options['session_length'], 1.0), size=n_sessions)
+        session_users = rng.choice(len(user_weights), size=n_sessions, p=user_weights)
+        stocked = np.asarray([code for code, items in enumerate(category_products) if len(items)])
+        session_categories = np.where(
+            rng.random(n_sessions) < 0.7,
+            preferred_category[session_users],
+            rng.choice(stocked, size=n_sessions)
+        )
+        empty = np.isin(session_categories, stocked, invert=True)
+        session_categories[empty] = rng.choice(stocked, size=empty.sum())
+        session_starts = rng.uniform(0, options['days'] * 86400, size=n_sessions)
+
+        sessions = np.repeat(np.arange(n_sessions), lengths)
+        first = np.r_[0, np.cumsum(lengths)[:-1]]
+        last = first + lengths - 1
+        products = np.zeros(len(sessions), dtype=np.int64)
+        for code in stocked:
+            mask = session_categories[sessions] == code
+            products[mask] = rng.choice(category_products[code], size=mask.sum(), p=category_weights[code])
+
+        elapsed = np.cumsum(rng.exponential(45.0, size=len(sessions)))
+        elapsed -= np.repeat(elapsed[first], lengths)
+        offsets = np.maximum(session_starts[sessions] - elapsed, 0)
+
+        feedback = rng.random(len(sessions))
+        interaction_types = np.where(feedback < 0.08, 'like', np.where(feedback < 0.11, 'dislike', 'view')).astype(object)
+
+        carted = np.flatnonzero(rng.random(n_sessions) < 0.25)
+        purchased = carted[rng.random(len(carted)) < 0.4]
+        picks = first + (rng.random(n_sessions) * lengths).astype(np.int64)
+
+        parts = [(sessions, session_users[sessions], products, interaction_types, offsets)]
+        for chosen, interaction_type, delay in ((carted, 'add_to_cart', 30.0), (purchased, 'purchase', 120.0)):
+            parts.append((
+                chosen,
+                session_users[chosen],
+                products[picks[chosen]],
+                np.full(len(chosen), interaction_type, dtype=object),
+                np.maximum(offsets[last[chosen]] - delay, 0),
+            ))
+
+        columns = [np.concatenate(column) for column in zip(*parts)]
+        order = np.argsort(columns[0], kind='stable')[:n_events]
+        return tuple(column[order] for column in columns)
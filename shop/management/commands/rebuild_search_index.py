@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.search import create_search_index, rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index from the product table'
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if backend is None:
+            self.stdout.write('This database has no full-text backend, search falls back to substring matching')
+            return
+
+        started = time.perf_counter()
+        create_search_index()
+        indexed = rebuild_search_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} products with {backend} in {time.perf_counter() - started:.2f}s')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from shop.inventory import release_expired_reservations, sync_sharded_stock
+
+
+class Command(BaseCommand):
+    help = 'Return stock held by expired cart reservations and refresh the stock shown for sharded products'
+
+    def handle(self, *args, **options):
+        released = 0
+        while True:
+            batch = release_expired_reservations()
+            released += batch
+            if not batch:
+                break
+
+        synced = sync_sharded_stock()
+        self.stdout.write(
+            self.style.SUCCESS(f'Released {released} expired reservations, refreshed stock for {synced} sharded products')
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.inventory import set_stock_shards
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Split a hot product\'s stock counter across several rows, or merge it back with --shards 0'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug of the product')
+        parser.add_argument('--shards', type=int, default=8, help='Number of counter rows, 0 to merge back')
+
+    def handle(self, *args, **options):
+        if options['shards'] < 0:
+            raise CommandError('--shards must be zero or positive')
+
+        try:
+            product = Product.objects.get(slug=options['slug'])
+        except Product.DoesNotExist:
+            raise CommandError(f"No product with slug {options['slug']}")
+
+        total = set_stock_shards(product, options['shards'])
+        if options['shards']:
+            self.stdout.write(self.style.SUCCESS(f'Split {total} units of {product.name} across {options["shards"]} shards'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Merged {total} units of {product.name} back into one counter'))
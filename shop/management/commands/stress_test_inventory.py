@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import nullcontext
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import override_settings
+
+from shop.checkout import place_order
+from shop.ingestion import interaction_writer
+from shop.inventory import (
+    OutOfStock, available_stock, release_expired_reservations, release_stock, reserve_stock, set_stock_shards
+)
+from shop.models import Cart, CartItem, Category, OrderItem, Product, StockReservation
+
+
+class Command(BaseCommand):
+    help = 'Hammer one product with concurrent reservations and checkouts, then check that no stock was lost or oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent buyers')
+        parser.add_argument('--attempts', type=int, default=25, help='Purchase attempts per buyer')
+        parser.add_argument('--stock', type=int, default=200, help='Initial stock of the test product')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per purchase attempt')
+        parser.add_argument('--shards', type=int, default=0, help='Split the stock counter across this many rows')
+        parser.add_argument('--abandon', type=float, default=0.2, help='Fraction of carts abandoned after reserving')
+        parser.add_argument('--ttl', type=float, default=None,
+                            help='Reservation lifetime in seconds during the test; abandoned carts are left to expire')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the buyers')
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'Inventory stress test {token}', slug=f'inventory-stress-{token}')
+        product = Product.objects.create(
+            name=f'Inventory stress test {token}',
+            slug=f'inventory-stress-{token}',
+            category=category,
+            description='Temporary product used by stress_test_inventory',
+            price=Decimal('1.00'),
+            stock=options['stock'],
+            available=False
+        )
+        user = User.objects.create_user(f'inventory-stress-{token}')
+        if options['shards']:
+            set_stock_shards(product, options['shards'])
+
+        try:
+            ttl = options['ttl']
+            with override_settings(INVENTORY_RESERVATION_SECONDS=ttl) if ttl is not None else nullcontext():
+                counts, elapsed = self.run_buyers(product, user, token, options)
+                if ttl is not None:
+                    time.sleep(ttl)
+                    counts['expired_released'] += release_expired_reservations(product)
+
+            remaining = available_stock(product)
+            held = StockReservation.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            sold = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+        finally:
+            interaction_writer.flush()
+            Cart.objects.filter(session_key__startswith=f'stress-{token}-').delete()
+            user.delete()
+            category.delete()
+
+        self.stdout.write(
+            f"{options['threads']} buyers, {counts['attempts']} attempts in {elapsed:.2f}s: "
+            f"{counts['reserved']} reserved, {counts['orders']} orders, {counts['sold_out']} sold out, "
+            f"{counts['abandoned']} abandoned, {counts['checkout_failed']} failed at checkout, "
+            f"{counts['expired_released']} expired reservations released, {counts['errors']} database errors"
+        )
+        self.stdout.write(f"stock {options['stock']} = remaining {remaining} + held {held} + sold {sold}")
+
+        if remaining + held + sold != options['stock']:
+            raise CommandError(f"Stock accounting is off by {options['stock'] - remaining - held - sold} units")
+        if counts['orders'] * options['quantity'] != sold:
+            raise CommandError(f"{counts['orders']} orders placed but {sold} units recorded as sold")
+        self.stdout.write(self.style.SUCCESS(f"No stock lost or oversold ({counts['orders'] / elapsed:.1f} orders/s)"))
+
+    def run_buyers(self, product, user, token: str, options: dict):
+        counts = Counter()
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def sweeper():
+            try:
+                while not done.wait(0.1):
+                    released = release_expired_reservations(product)
+                    with lock:
+                        counts['expired_released'] += released
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=self.buyer, args=(product, user, token, worker, options, counts, lock))
+            for worker in range(options['threads'])
+        ]
+        if options['ttl'] is not None:
+            threads.append(threading.Thread(target=sweeper))
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads[:options['threads']]:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in threads[options['threads']:]:
+            thread.join()
+        return counts, elapsed
+
+    def buyer(self, product, user, token: str, worker: int, options: dict, counts: Counter, lock: threading.Lock):
+        rng = random.Random(options['seed'] * 1000003 + worker)
+        product = Product.objects.get(pk=product.pk)
+        local = Counter()
+        try:
+            for attempt in range(options['attempts']):
+                local['attempts'] += 1
+                try:
+                    self.attempt(product, user, f'stress-{token}-{worker}-{attempt}', rng, options, local)
+                except OperationalError:
+                    local['errors'] += 1
+        finally:
+            connection.close()
+            with lock:
+                counts.update(local)
+
+    def attempt(self, product, user, session_key: str, rng: random.Random, options: dict, counts: Counter):
+        cart = Cart.objects.create(session_key=session_key)
+        try:
+            with transaction.atomic():
+                reserve_stock(cart, product, options['quantity'])
+                CartItem.objects.create(cart=cart, product=product, quantity=options['quantity'])
+        except OutOfStock:
+            counts['sold_out'] += 1
+            return
+        counts['reserved'] += 1
+
+        if rng.random() < options['abandon']:
+            counts['abandoned'] += 1
+            if options['ttl'] is None:
+                release_stock(cart, product)
+            return
+
+        try:
+            place_order(cart, user, 'Stress test', '0000000000', 'stress@example.com', session_key)
+            counts['orders'] += 1
+        except OutOfStock:
+            counts['checkout_failed'] += 1
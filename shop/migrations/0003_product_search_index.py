@@ -0,0 +1,58 @@
+import uuid
+
+from django.db import migrations
+
+SEARCH_TABLE = 'shop_product_fts'
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def create_index(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                f"product_id UNINDEXED, name, description, tags, tokenize='porter unicode61')"
+            )
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, product_id, name, description, tags) VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (uuid.UUID(str(product_id)).int >> 65, uuid.UUID(str(product_id)).hex, name, description, tags)
+                    for product_id, name, description, tags in Product.objects.using(connection.alias).filter(
+                        available=True
+                    ).values_list('id', 'name', 'description', 'tags')
+                ]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('ALTER TABLE shop_product ADD COLUMN IF NOT EXISTS search_vector tsvector')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS shop_product_search_vector_idx ON shop_product USING GIN (search_vector)'
+            )
+            cursor.execute(f'UPDATE shop_product SET search_vector = {POSTGRES_VECTOR}')
+
+
+def drop_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS shop_product_search_vector_idx')
+            cursor.execute('ALTER TABLE shop_product DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_alter_product_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
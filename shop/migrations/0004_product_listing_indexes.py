@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_product_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shop_produc_created_ed077b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shop_produc_popular_4d4f4c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='shop_produc_created_467304_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['popularity_score', 'id'], name='shop_produc_popular_357119_idx'),
+        ),
+    ]
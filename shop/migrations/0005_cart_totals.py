@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:37
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('shop', 'Cart')
+    CartItem = apps.get_model('shop', 'CartItem')
+    items = CartItem.objects.filter(cart=models.OuterRef('pk')).values('cart')
+    total_items = items.annotate(total=models.Sum('quantity')).values('total')
+    total_price = items.annotate(total=models.Sum(models.F('quantity') * models.F('product__price'))).values('total')
+    Cart.objects.update(
+        total_items=Coalesce(models.Subquery(total_items), 0),
+        total_price=Coalesce(models.Subquery(total_price), Decimal('0.00'), output_field=models.DecimalField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
 import uuid
 
 class Category(models.Model):
@@ -23,6 +26,7 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
+    stock_shards = models.PositiveSmallIntegerField(default=0)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -35,8 +39,8 @@ class Product(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['category', 'available']),
-            models.Index(fields=['created_at']),
-            models.Index(fields=['popularity_score']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['popularity_score', 'id']),
         ]
 
     def __str__(self):
@@ -49,6 +53,8 @@ class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     session_key = models.CharField(max_length=40, null=True, blank=True)
+    total_items = models.PositiveIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -56,10 +62,14 @@ class Cart(models.Model):
         return f"Cart {self.id}"
 
     def get_total_price(self):
-        return sum(item.get_total_price() for item in self.items.all())
+        return self.total_price
 
     def get_total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.total_items
+
+    def refresh_totals(self):
+        refresh_cart_totals(Cart.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=['total_items', 'total_price'])
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -76,6 +86,18 @@ class CartItem(models.Model):
     def get_total_price(self):
         return self.quantity * self.product.price
 
+def cart_totals(cart_items):
+    items = cart_items.filter(cart=models.OuterRef('pk')).values('cart')
+    total_items = items.annotate(total=models.Sum('quantity')).values('total')
+    total_price = items.annotate(total=models.Sum(models.F('quantity') * models.F('product__price'))).values('total')
+    return {
+        'total_items': Coalesce(models.Subquery(total_items), 0),
+        'total_price': Coalesce(models.Subquery(total_price), Decimal('0.00'), output_field=models.DecimalField()),
+    }
+
+def refresh_cart_totals(carts):
+    return carts.update(updated_at=timezone.now(), **cart_totals(CartItem.objects.all()))
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -113,6 +135,30 @@ class OrderItem(models.Model):
     def get_total_price(self):
         return self.quantity * self.price
 
+class StockReservation(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('cart', 'product')
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held by {self.cart_id}"
+
+class StockShard(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shard_set')
+    shard = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'shard')
+
+    def __str__(self):
+        return f"{self.product_id} shard {self.shard}: {self.stock}"
+
 class UserInteraction(models.Model):
     INTERACTION_CHOICES = [
         ('view', 'View'),
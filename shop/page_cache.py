@@ -0,0 +1,53 @@
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .catalog_cache import catalog_version
+
+PAGE_PARAMETERS = ('category', 'q', 'mode', 'sort', 'after')
+
+
+def page_cache_key(request) -> str:
+    params = urlencode(sorted((name, request.GET[name]) for name in PAGE_PARAMETERS if request.GET.get(name)))
+    digest = hashlib.md5(f'{request.path}?{params}'.encode()).hexdigest()
+    return f'page:{catalog_version()}:{digest}'
+
+
+def cacheable(request) -> bool:
+    return (
+        bool(settings.PAGE_CACHE_TIMEOUT)
+        and request.method == 'GET'
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def cache_anonymous_page(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not cacheable(request):
+            return view(request, *args, **kwargs)
+
+        store = caches['pages']
+        key = page_cache_key(request)
+        page = store.get(key)
+        if page is not None:
+            content, content_type = page
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                store.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+
+        get_token(request)
+        return response
+
+    return wrapper
@@ -0,0 +1,68 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.db.models.functions import Substr
+
+LISTING_ORDERINGS = {
+    'newest': 'created_at',
+    'popular': 'popularity_score',
+}
+LISTING_FIELDS = ('id', 'name', 'slug', 'price', 'stock', 'image', 'rating', 'popularity_score', 'created_at')
+SUMMARY_LENGTH = 120
+
+
+def listing_ordering(sort: str) -> str:
+    return sort if sort in LISTING_ORDERINGS else 'newest'
+
+
+def listing_columns(products):
+    return products.only(*LISTING_FIELDS).annotate(summary=Substr('description', 1, SUMMARY_LENGTH))
+
+
+def encode_cursor(sort: str, product) -> str:
+    value = getattr(product, LISTING_ORDERINGS[sort])
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, product.id.hex], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(sort: str, cursor: str):
+    if not cursor:
+        return None
+
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, product_id = json.loads(payload)
+        if cursor_sort != sort:
+            return None
+        if LISTING_ORDERINGS[sort] == 'created_at':
+            value = datetime.fromisoformat(value)
+        else:
+            value = float(value)
+        return value, uuid.UUID(product_id)
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def keyset_page(products, sort: str, cursor: str, page_size: int):
+    field = LISTING_ORDERINGS[sort]
+    products = products.order_by(f'-{field}', '-id')
+    position = decode_cursor(sort, cursor)
+    if position is not None:
+        value, product_id = position
+        products = products.filter(**{f'{field}__lte': value}).exclude(**{field: value, 'id__gte': product_id})
+
+    page = list(products[:page_size + 1])
+    next_cursor = encode_cursor(sort, page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+def page_url(path: str, params, **changes) -> str:
+    params = {**params.dict(), **changes}
+    query = urlencode(sorted((key, value) for key, value in params.items() if value))
+    return f'{path}?{query}' if query else path
@@ -0,0 +1,198 @@
+import re
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Product
+
+SEARCH_MODES = ('text', 'semantic')
+SEARCH_TABLE = 'shop_product_fts'
+SEARCH_FIELDS = ('name', 'description', 'tags')
+SEARCH_WEIGHTS = {'name': 'A', 'tags': 'B', 'description': 'C'}
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def search_backend(db_connection=None) -> str:
+    db_connection = db_connection or connection
+    if db_connection.vendor == 'postgresql':
+        return 'postgres'
+    if db_connection.vendor == 'sqlite':
+        return 'fts5'
+    return None
+
+
+def search_rowid(product_id) -> int:
+    return uuid.UUID(str(product_id)).int >> 65
+
+
+def postgres_vector_sql() -> str:
+    return ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({field}, '')), '{weight}')"
+        for field, weight in SEARCH_WEIGHTS.items()
+    )
+
+
+def create_search_index(db_connection=None):
+    db_connection = db_connection or connection
+    backend = search_backend(db_connection)
+    with db_connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                f"product_id UNINDEXED, {', '.join(SEARCH_FIELDS)}, tokenize='porter unicode61')"
+            )
+        elif backend == 'postgres':
+            cursor.execute('ALTER TABLE shop_product ADD COLUMN IF NOT EXISTS search_vector tsvector')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS shop_product_search_vector_idx ON shop_product USING GIN (search_vector)'
+            )
+
+
+def drop_search_index(db_connection=None):
+    db_connection = db_connection or connection
+    backend = search_backend(db_connection)
+    with db_connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+        elif backend == 'postgres':
+            cursor.execute('DROP INDEX IF EXISTS shop_product_search_vector_idx')
+            cursor.execute('ALTER TABLE shop_product DROP COLUMN IF EXISTS search_vector')
+
+
+def index_products(products, db_connection=None):
+    db_connection = db_connection or connection
+    backend = search_backend(db_connection)
+    products = list(products)
+    if not products or backend is None:
+        return
+
+    with db_connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [(search_rowid(product.id),) for product in products]
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, product_id, name, description, tags) VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (search_rowid(product.id), product.id.hex, product.name, product.description, product.tags)
+                    for product in products if product.available
+                ]
+            )
+        else:
+            cursor.execute(
+                f'UPDATE shop_product SET search_vector = {postgres_vector_sql()} WHERE id = ANY(%s::uuid[])',
+                [[str(product.id) for product in products]]
+            )
+
+
+def remove_products(product_ids, db_connection=None):
+    db_connection = db_connection or connection
+    if search_backend(db_connection) != 'fts5':
+        return
+
+    with db_connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [(search_rowid(product_id),) for product_id in product_ids]
+        )
+
+
+def rebuild_search_index(db_connection=None) -> int:
+    db_connection = db_connection or connection
+    backend = search_backend(db_connection)
+    with db_connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute('SELECT id, name, description, tags FROM shop_product WHERE available')
+            rows = [
+                (search_rowid(product_id), uuid.UUID(str(product_id)).hex, name, description, tags)
+                for product_id, name, description, tags in cursor.fetchall()
+            ]
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, product_id, name, description, tags) VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+            return len(rows)
+        if backend == 'postgres':
+            cursor.execute(f'UPDATE shop_product SET search_vector = {postgres_vector_sql()}')
+            return cursor.rowcount
+    return 0
+
+
+def search_terms(query: str):
+    return TOKEN_PATTERN.findall(query.lower())[:settings.SEARCH_MAX_TERMS]
+
+
+def search_product_ids(query: str, limit: int = None, category=None):
+    terms = search_terms(query)
+    backend = search_backend()
+    if not terms or backend is None:
+        return None
+
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    category_sql = '' if category is None else ' AND shop_product.category_id = %s'
+    category_params = [] if category is None else [category.pk]
+    with connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(
+                f'SELECT {SEARCH_TABLE}.product_id FROM {SEARCH_TABLE} '
+                f'JOIN shop_product ON shop_product.id = {SEARCH_TABLE}.product_id '
+                f'WHERE {SEARCH_TABLE} MATCH %s AND shop_product.available{category_sql} '
+                f'ORDER BY bm25({SEARCH_TABLE}, 0.0, 10.0, 1.0, 4.0) LIMIT %s',
+                [' '.join(f'"{term}"*' for term in terms), *category_params, limit]
+            )
+        else:
+            cursor.execute(
+                "SELECT id FROM shop_product, to_tsquery('english', %s) query "
+                f'WHERE available AND search_vector @@ query{category_sql} '
+                'ORDER BY ts_rank(search_vector, query) DESC, id LIMIT %s',
+                [' & '.join(f'{term}:*' for term in terms), *category_params, limit]
+            )
+        return [uuid.UUID(str(product_id)) for product_id, in cursor.fetchall()]
+
+
+def semantic_product_ids(query: str, limit: int = None, category=None):
+    from recommendations.ml_engine import get_engine
+
+    engine = get_engine()
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    candidates = limit
+    while True:
+        result = engine.search_product_ids(query, candidates)
+        if result is None:
+            return None
+
+        product_ids = [uuid.UUID(product_id) for product_id in result[0]]
+        listed = Product.objects.filter(id__in=product_ids, available=True)
+        if category is not None:
+            listed = listed.filter(category=category)
+        listed = set(listed.values_list('id', flat=True))
+        matches = [product_id for product_id in product_ids if product_id in listed]
+        if len(matches) >= limit or len(product_ids) < candidates:
+            return matches[:limit]
+        candidates *= 4
+
+
+def search_products(products, query: str, mode: str = None, category=None):
+    mode = mode if mode in SEARCH_MODES else settings.SEARCH_MODE
+    product_ids = semantic_product_ids(query, category=category) if mode == 'semantic' else None
+    if not product_ids:
+        product_ids = search_product_ids(query, category=category)
+    if product_ids is None:
+        return products.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__icontains=query)
+        )
+
+    if not product_ids:
+        return products.none()
+
+    relevance = Case(
+        *[When(id=product_id, then=position) for position, product_id in enumerate(product_ids)],
+        output_field=IntegerField()
+    )
+    return products.filter(id__in=product_ids).annotate(relevance=relevance).order_by('relevance')
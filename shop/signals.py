@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from .catalog_cache import bump_catalog_version
+from .inventory import release_reservations
+from .models import Cart, Category, Product, refresh_cart_totals
+from .search import index_products, remove_products
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    index_products([instance])
+    if update_fields is None or 'price' in update_fields:
+        refresh_cart_totals(Cart.objects.filter(items__product=instance))
+
+
+@receiver(pre_delete, sender=Product)
+def collect_product_carts(sender, instance, **kwargs):
+    instance.cart_ids = list(Cart.objects.filter(items__product=instance).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def remove_deleted_product(sender, instance, **kwargs):
+    remove_products([instance.id])
+    refresh_cart_totals(Cart.objects.filter(id__in=getattr(instance, 'cart_ids', [])))
+
+
+@receiver(pre_delete, sender=Cart)
+def release_cart_reservations(sender, instance, **kwargs):
+    release_reservations(instance.reservations.all())
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
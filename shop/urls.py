@@ -5,6 +5,7 @@ app_name = 'shop'
 
 urlpatterns = [
     path('', views.product_list, name='product_list'),
+    path('products.json', views.product_listing, name='product_listing'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('cart/', views.cart_detail, name='cart_detail'),
     path('add-to-cart/<uuid:product_id>/', views.add_to_cart, name='add_to_cart'),
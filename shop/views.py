@@ -1,32 +1,58 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q
-from .models import Product, Category, Cart, CartItem, Order, OrderItem, UserInteraction
+from .models import Product, Cart, CartItem, Order
 from recommendations.ml_engine import get_recommendations
+from .ingestion import record_interaction
+from .checkout import place_order
+from .inventory import OutOfStock, release_stock, reserve_stock
+from .catalog_cache import cached, catalog_version, get_categories, get_category, get_product, get_related_products
+from .page_cache import cache_anonymous_page
+from .search import search_products
+from .pagination import LISTING_ORDERINGS, keyset_page, listing_columns, listing_ordering, page_url
 from django.shortcuts import render, get_object_or_404, redirect
 import json
 
-def product_list(request):
+def filtered_products(request):
     products = Product.objects.filter(available=True)
-    categories = Category.objects.all()
     
     selected_category = None
     category_slug = request.GET.get('category')
     if category_slug:
-        selected_category = get_object_or_404(Category, slug=category_slug)
+        selected_category = get_category(category_slug)
+        if selected_category is None:
+            raise Http404('No category matches the given query.')
         products = products.filter(category=selected_category)
+    return products, selected_category
+
+@cache_anonymous_page
+def product_list(request):
+    products, selected_category = filtered_products(request)
+    categories = get_categories()
+    category_slug = request.GET.get('category')
+    sort = listing_ordering(request.GET.get('sort'))
     
+    next_page_url = None
     query = request.GET.get('q')
+    search_mode = request.GET.get('mode')
+    after = request.GET.get('after')
     if query:
-        products = products.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(tags__icontains=query)
-        )
+        listing_key = f'search:{search_mode}:{category_slug}:{query}'
+        products = cached(listing_key, lambda: list(
+            listing_columns(search_products(products, query, search_mode, selected_category))[:settings.SEARCH_MAX_RESULTS]
+        ))
+    else:
+        listing_key = f'listing:{category_slug}:{sort}:{after}:{settings.PRODUCT_PAGE_SIZE}'
+        products, next_cursor = cached(listing_key, lambda: keyset_page(
+            listing_columns(products), sort, after, settings.PRODUCT_PAGE_SIZE
+        ))
+        if next_cursor:
+            next_page_url = page_url(request.path, request.GET, after=next_cursor)
     
     recommendations = []
     if request.user.is_authenticated:
@@ -37,26 +63,57 @@ def product_list(request):
         'categories': categories,
         'recommendations': recommendations,
         'query': query,
+        'search_mode': search_mode,
         'current_category': category_slug,
         'selected_category': selected_category,
+        'sort': sort,
+        'sort_urls': {name: page_url(request.path, request.GET, sort=name, after=None) for name in LISTING_ORDERINGS},
+        'first_page_url': page_url(request.path, request.GET, after=None) if request.GET.get('after') else None,
+        'next_page_url': next_page_url,
+        'listing_key': listing_key,
+        'catalog_version': catalog_version(),
+        'fragment_timeout': settings.PAGE_CACHE_TIMEOUT,
     }
     return render(request, 'shop/product_list.html', context)
 
+def product_listing(request):
+    products, _ = filtered_products(request)
+    sort = listing_ordering(request.GET.get('sort'))
+    try:
+        limit = min(max(int(request.GET.get('limit', settings.PRODUCT_PAGE_SIZE)), 1), settings.PRODUCT_PAGE_MAX_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+    
+    page, next_cursor = keyset_page(listing_columns(products), sort, request.GET.get('after'), limit)
+    return JsonResponse({
+        'products': [
+            {
+                'id': str(product.id),
+                'name': product.name,
+                'slug': product.slug,
+                'price': str(product.price),
+                'summary': product.summary,
+                'rating': product.rating,
+                'in_stock': product.stock > 0,
+                'image_url': product.image.url if product.image else None,
+                'url': product.get_absolute_url(),
+            } for product in page
+        ],
+        'sort': sort,
+        'count': len(page),
+        'next': page_url(request.path, request.GET, after=next_cursor) if next_cursor else None,
+    })
+
+@cache_anonymous_page
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, available=True)
+    product = get_product(slug)
+    if product is None:
+        raise Http404('No product matches the given query.')
     
     if request.user.is_authenticated:
-        UserInteraction.objects.create(
-            user=request.user,
-            product=product,
-            interaction_type='view',
-            session_key=request.session.session_key
-        )
-    
-    related_products = Product.objects.filter(
-        category=product.category,
-        available=True
-    ).exclude(id=product.id)[:4]
+        record_interaction(request.user, product, 'view', request.session.session_key)
+    
+    related_products = get_related_products(product, 4)
     
     recommendations = []
     if request.user.is_authenticated:
@@ -66,6 +123,8 @@ def product_detail(request, slug):
         'product': product,
         'related_products': related_products,
         'recommendations': recommendations,
+        'catalog_version': catalog_version(),
+        'fragment_timeout': settings.PAGE_CACHE_TIMEOUT,
     }
     return render(request, 'shop/product_detail.html', context)
 
@@ -80,6 +139,12 @@ def get_or_create_cart(request):
         cart, created = Cart.objects.get_or_create(session_key=session_key)
     return cart
 
+def stock_error(request, error, fallback):
+    messages.error(request, str(error))
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': False, 'message': str(error)}, status=409)
+    return fallback
+
 @require_POST
 def add_to_cart(request, product_id):
     product = get_object_or_404(Product, id=product_id, available=True)
@@ -87,23 +152,24 @@ def add_to_cart(request, product_id):
     
     quantity = int(request.POST.get('quantity', 1))
     
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'quantity': quantity}
-    )
-    
-    if not created:
-        cart_item.quantity += quantity
-        cart_item.save()
+    try:
+        with transaction.atomic():
+            reserve_stock(cart, product, quantity)
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=cart,
+                product=product,
+                defaults={'quantity': quantity}
+            )
+            
+            if not created:
+                cart_item.quantity += quantity
+                cart_item.save()
+    except OutOfStock as error:
+        return stock_error(request, error, redirect('shop:product_detail', slug=product.slug))
+    cart.refresh_totals()
     
     if request.user.is_authenticated:
-        UserInteraction.objects.create(
-            user=request.user,
-            product=product,
-            interaction_type='add_to_cart',
-            session_key=request.session.session_key
-        )
+        record_interaction(request.user, product, 'add_to_cart', request.session.session_key)
     
     messages.success(request, f'{product.name} added to cart!')
     
@@ -118,7 +184,7 @@ def add_to_cart(request, product_id):
 
 def cart_detail(request):
     cart = get_or_create_cart(request)
-    cart_items = cart.items.select_related('product').all()
+    cart_items = cart.items.select_related('product__category').all()
     
     context = {
         'cart': cart,
@@ -131,13 +197,23 @@ def update_cart_item(request, item_id):
     cart = get_or_create_cart(request)
     cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
     
-    quantity = int(request.POST.get('quantity', 1))
+    quantity = max(int(request.POST.get('quantity', 1)), 0)
     
-    if quantity > 0:
-        cart_item.quantity = quantity
-        cart_item.save()
-    else:
-        cart_item.delete()
+    try:
+        with transaction.atomic():
+            if quantity > cart_item.quantity:
+                reserve_stock(cart, cart_item.product, quantity - cart_item.quantity)
+            else:
+                release_stock(cart, cart_item.product, cart_item.quantity - quantity)
+            
+            if quantity > 0:
+                cart_item.quantity = quantity
+                cart_item.save()
+            else:
+                cart_item.delete()
+    except OutOfStock as error:
+        return stock_error(request, error, redirect('shop:cart_detail'))
+    cart.refresh_totals()
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
@@ -152,7 +228,10 @@ def update_cart_item(request, item_id):
 def remove_from_cart(request, item_id):
     cart = get_or_create_cart(request)
     cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-    cart_item.delete()
+    with transaction.atomic():
+        release_stock(cart, cart_item.product)
+        cart_item.delete()
+    cart.refresh_totals()
     
     messages.success(request, f'{cart_item.product.name} removed from cart!')
     
@@ -175,30 +254,21 @@ def checkout(request):
         return redirect('shop:cart_detail')
     
     if request.method == 'POST':
-        order = Order.objects.create(
-            user=request.user,
-            total_amount=cart.get_total_price(),
-            shipping_address=request.POST['shipping_address'],
-            phone_number=request.POST['phone_number'],
-            email=request.POST['email'],
-        )
-        
-        for cart_item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            
-            UserInteraction.objects.create(
-                user=request.user,
-                product=cart_item.product,
-                interaction_type='purchase',
+        try:
+            order = place_order(
+                cart,
+                request.user,
+                shipping_address=request.POST['shipping_address'],
+                phone_number=request.POST['phone_number'],
+                email=request.POST['email'],
                 session_key=request.session.session_key
             )
-        
-        cart.items.all().delete()
+        except OutOfStock as error:
+            messages.error(request, f'{error}. Please update your cart.')
+            return redirect('shop:cart_detail')
+        if order is None:
+            messages.error(request, 'Your cart is empty!')
+            return redirect('shop:cart_detail')
         
         messages.success(request, f'Order {order.id} placed successfully!')
         return redirect('shop:order_success', order_id=order.id)
@@ -228,17 +298,6 @@ def product_feedback(request, product_id):
     if feedback_type not in ['like', 'dislike']:
         return JsonResponse({'error': 'Invalid feedback type'}, status=400)
     
-    UserInteraction.objects.filter(
-        user=request.user,
-        product=product,
-        interaction_type__in=['like', 'dislike']
-    ).delete()
-    
-    UserInteraction.objects.create(
-        user=request.user,
-        product=product,
-        interaction_type=feedback_type,
-        session_key=request.session.session_key
-    )
+    record_interaction(request.user, product, feedback_type, request.session.session_key)
     
     return JsonResponse({'success': True, 'message': f'Product {feedback_type}d!'})
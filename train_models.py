@@ -4,8 +4,11 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_project.settings')
 django.setup()
 
-from recommendations.ml_engine import retrain_models
+from recommendations.ml_engine import RecommendationEngine
 
 print("Training recommendation models...")
-retrain_models()
-print("Models trained successfully!")
+engine = RecommendationEngine()
+engine.train_models(save=True)
+print(f"Models trained successfully! Artifact version: {engine.artifact_version}")
+for stage, seconds in engine.stage_timings.items():
+    print(f"  {stage}: {seconds:.2f}s")